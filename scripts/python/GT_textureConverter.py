@@ -1,27 +1,86 @@
 ####################### GT_textureConvert #######################
 
 # Imports
-import os, subprocess, re
+import os
 
-from utils import helpers
+from utils import helpers, conversion, converters, cache, manifest, scheduling, scanner, instrumentation, watcher, loader
 from utils.decorators import err_catcher
 
 #PySide2 and Qt imports
-from PySide2.QtCore import Signal
+from PySide2.QtCore import QObject, Signal
 from PySide2.QtWidgets import (QApplication, QDialog)
 
-# UI Imports
-from ui import GT_textureConverter_ui as ui
+# UI Imports, the window module is imported when a window is shown
+ui = loader.lazyImport("ui.GT_textureConverter_ui")
 
-# Importlib temp
-import importlib
-importlib.reload(ui)
-importlib.reload(helpers)
+# Reload the modules on each launch in dev mode (GTTOOLS_DEV=1), dependencies first
+loader.reloadModules(helpers, instrumentation, cache, manifest, scheduling, scanner, converters, watcher, conversion, ui)
 
 # Global variables
-FILTER = [".png", ".jpg", ".jpeg", ".tif", ".tiff", ".exr"]
+FILTER = conversion.FILTER
 # Texture Converter code
 
+class ConversionMonitor(QObject):
+    # Forward the conversion service events (emitted from its worker thread) as Qt signals
+    jobQueued = Signal(object)
+    jobStarted = Signal(object)
+    jobFinished = Signal(object)
+
+    def __init__(self, service, parent = None):
+        super(ConversionMonitor, self).__init__(parent)
+        self.service = service
+        self.service.addListener(self.notify)
+
+    def notify(self, event, job):
+        if event == conversion.QUEUED:
+            self.jobQueued.emit(job)
+        elif event == conversion.STARTED:
+            self.jobStarted.emit(job)
+        elif event == conversion.FINISHED:
+            self.jobFinished.emit(job)
+
+# Keep the monitor connected to the running service when the module is reloaded
+try:
+    monitor
+except NameError:
+    monitor = None
+
+def getMonitor():
+    global monitor
+    service = conversion.getService()
+    if monitor is None or monitor.service is not service:
+        monitor = ConversionMonitor(service)
+    return monitor
+
+def submitConversions(jobs, workers = None, parent = None, memoryBudget = None):
+    # Queue the jobs on the background service and follow them in a non blocking progress window
+    jobs = conversion.getService(workers, memoryBudget).submit(jobs)
+    if not jobs:
+        return jobs
+
+    monitor = getMonitor()
+    progress = ui.progressConversionWindow(label = "Converting textures...", maximum = len(jobs), parent=parent)
+    trackedJobs = {job.id for job in jobs}
+    finishedJobs = {job.id for job in jobs if not job.isActive()}
+    progress.setValue(len(finishedJobs))
+
+    def jobFinished(job):
+        if job.id not in trackedJobs or job.id in finishedJobs:
+            return
+        finishedJobs.add(job.id)
+        progress.setLabelText(f"Converted {os.path.basename(job.inputFile)}")
+        progress.setValue(len(finishedJobs))
+        if len(finishedJobs) == len(trackedJobs):
+            monitor.jobFinished.disconnect(jobFinished)
+            # Keep the window open on the throughput summary, the per-file timings go to the JSON report
+            report = instrumentation.ConversionReport(jobs)
+            reportPath = report.write()
+            progress.showSummary(report.summary(), reportPath)
+
+    monitor.jobFinished.connect(jobFinished)
+    progress.canceled.connect(lambda: conversion.getService().cancel(jobs))
+    return jobs
+
 class textureConverter(QDialog):
     def __init__(self, parent = QApplication.activeWindow()):
         super(textureConverter, self).__init__(parent)
@@ -29,61 +88,27 @@ class textureConverter(QDialog):
         #Instantiate UI
         self.converterWindow = ui.TextureConverterWindow(self)
         self.converterWindow.start.connect(self.startConversion)
+        self.converterWindow.stopWatching.connect(self.stopWatching)
+        self.converterWindow.setWatchedFolders(watcher.watchedFolders())
 
         self.converterWindow.show()
 
     @err_catcher(name = __name__, silent=True)
-    def startConversion(self, settings, texturePattern = []):
+    def startConversion(self, settings):
         inputDirectory = settings.get("inputDirectory", "")
-        outputDirectory = settings.get("outputDirectory", "")
-        renderEngine = settings.get("renderEngine", [])
+        workers = settings.get("workers", conversion.defaultWorkerCount())
         if inputDirectory != "":
+            # Conversions run in the background, the window can be closed right away
+            jobs = conversion.collectConversions(settings)
+            submitConversions(jobs, workers = workers, parent = self, memoryBudget = settings.get("memoryBudget"))
+            # Then convert the textures exported to the folder from now on
+            if settings.get("watch", False):
+                conversion.watchFolder(settings, workers = workers)
 
-            filesToConvert = []
-            for engine in renderEngine:
-                if "Karma" in renderEngine:
-                    executable = helpers.getBinary("iconvert")
-                    extension = ".rat"
-                if not executable:
-                    raise Exception("iconvert not found. Please check your Houdini installation.")
-                # Handle UDIM patterns (GT Material Builder)
-                
-                if texturePattern != []:
-                    for pattern in texturePattern:
-                        if "<UDIM>" in pattern:
-                            # Find all matching UDIM files
-                            basePattern = pattern.replace("<UDIM>", r"\d{4}")
-                            regex = re.compile(basePattern.replace(".", r"\."))
-                            for fileName in os.listdir(self.absTextureDir):
-                                if regex.match(fileName) and any(fileName.endswith(ext) for ext in FILTER):
-                                    inputFile = os.path.join(self.absTextureDir, fileName)
-                                    outputFile = os.path.splitext(inputFile)[0] + extension
-                                    if not os.path.isfile(outputFile):
-                                        filesToConvert.append((inputFile, outputFile))
-                else:
-                    for fileName in os.listdir(inputDirectory):
-                        if not any(fileName.endswith(ext) for ext in FILTER):
-                            continue
-                        inputFile = os.path.join(inputDirectory, fileName)
-                        if outputDirectory == "${rootFolder}":
-                            outputFile = os.path.splitext(inputFile)[0] + extension
-                        else:
-                            if not os.path.isdir(outputDirectory):
-                                os.makedirs(outputDirectory)
-                            outputFile = os.path.join(outputDirectory, os.path.splitext(fileName)[0] + extension)
-                        if not os.path.isfile(outputFile):
-                            filesToConvert.append((inputFile, outputFile))
-        
-            progress = ui.progressConversionWindow(label = "Converting textures...", maximum = len(filesToConvert), parent=self)
-            for i, (inputFile, outputFile) in enumerate(filesToConvert):
-                if progress.wasCanceled():
-                    break
-                command = f'"{executable}" "{inputFile}" "{outputFile}"'
-                subprocess.run(command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=subprocess.CREATE_NO_WINDOW)
-                progress.setValue(i + 1)
-                QApplication.processEvents()
-            progress.close()
-    
             self.converterWindow.close()
         else:
-            raise Exception("Plase select a valid texture directory.")
\ No newline at end of file
+            raise Exception("Plase select a valid texture directory.")
+
+    def stopWatching(self):
+        watcher.stopWatching()
+        self.converterWindow.setWatchedFolders(watcher.watchedFolders())
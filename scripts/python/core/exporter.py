@@ -0,0 +1,335 @@
+####################### Material Exporter #######################
+# Write the scanned materials straight to MaterialX documents or USDA material layers, without
+# creating any Houdini node. The networks follow the same wiring table as the material builder
+# (see core.wiring), and this module does not need hou : it runs in python, hython or PDG.
+#
+#   python -m core.exporter /proj/textures /proj/materials --format usda --batch --recursive
+# Imports
+import os
+import sys
+import argparse
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+from utils import scanner
+from core import wiring, textures
+
+# Global variables
+MTLX = "mtlx"
+USDA = "usda"
+MTLX_VERSION = "1.38"
+
+# Houdini colorspaces of the wiring table -> MaterialX colorspaces, None leaves the data untagged
+MTLX_COLORSPACES = {"srgb_tx": "srgb_texture", "ACEScg": "acescg", "Raw": None}
+
+# MaterialX nodes of the wiring table : category -> (output type, {input name: type}), None : same type as the output
+MTLX_NODES = {
+    "normalmap": ("vector3", {"in": "vector3", "normal": "vector3"}),
+    "heighttonormal": ("vector3", {"in": "float"}),
+    "bump": ("vector3", {"height": "float"}),
+    "invert": (None, {"in": None}),
+    "multiply": (None, {"in1": None, "in2": "float"}),
+    }
+
+# Input types of the shaders the channels are connected to
+STANDARD_SURFACE_INPUTS = {
+    "base_color": "color3", "specular": "float", "specular_color": "color3", "specular_roughness": "float",
+    "metalness": "float", "normal": "vector3", "opacity": "color3", "subsurface": "float",
+    "subsurface_color": "color3", "subsurface_radius": "color3", "emission": "float", "emission_color": "color3",
+    "displacement": "float",
+    }
+PREVIEW_SURFACE_INPUTS = {"diffuseColor": "color3f", "roughness": "float", "metallic": "float", "opacity": "float", "emissiveColor": "color3f"}
+# usduvtexture output index -> UsdUVTexture output
+PREVIEW_OUTPUTS = {0: ("r", "float"), 1: ("g", "float"), 2: ("b", "float"), 3: ("a", "float"), 4: ("rgb", "float3")}
+USD_TYPES = {"float": "float", "color3": "color3f", "vector3": "vector3f", "vector2": "float2"}
+
+class ShaderNode:
+    # A node of an exported network. inputs : {name: (type, value)} and connections : {name: (type, node, output)}
+    def __init__(self, name, category, nodeType):
+        self.name = name
+        self.category = category
+        self.type = nodeType
+        self.inputs = OrderedDict()
+        self.connections = OrderedDict()
+        self.colorspace = None
+
+def uniqueName(nodes, name):
+    index = 1
+    uniqueName = name
+    while uniqueName in nodes:
+        index += 1
+        uniqueName = f"{name}{index}"
+    return uniqueName
+
+def mtlxNetwork(asset, channels, wiringTable, settings):
+    # MaterialX nodes of an asset : ({name: ShaderNode}, surface node, displacement node or None)
+    baseName = textures.nodeName(asset.baseName)
+    udimChannels = asset.channels()
+    convertBitmap = settings.get("convertBitmap", False)
+    nodes = OrderedDict()
+    surface = nodes[baseName + "_surface"] = ShaderNode(baseName + "_surface", "standard_surface", "surfaceshader")
+    displacement = None
+    uv = nodes["UV"] = ShaderNode("UV", "texcoord", "vector2")
+    sharedNodes = {}
+    connections = {}
+    images = {}
+
+    def inputType(targetNode, inputName):
+        return STANDARD_SURFACE_INPUTS.get(inputName) if targetNode.category in ("standard_surface", "displacement") else None
+
+    for channel, entry in wiringTable.plan(wiring.MTLX, [channel for channel in channels if channel in udimChannels]):
+        # Combined channels (AO) are only connected to the node combining them
+        combineOnly = "inputName" not in entry
+        if combineOnly and "combine" not in entry:
+            continue
+        if entry.get("target") == "mtlxdisplacement":
+            if displacement is None:
+                displacement = nodes["mtlxdisplacement"] = ShaderNode("mtlxdisplacement", "displacement", "displacementshader")
+            targetNode = displacement
+        else:
+            targetNode = surface
+        targetType = (None if combineOnly else inputType(targetNode, entry["inputName"])) or entry.get("signature") or "color3"
+
+        # The texture has the type its first consumer expects
+        steps = entry.get("nodes", [])
+        imageType = targetType
+        if steps:
+            category = steps[0]["type"].replace("mtlx", "", 1)
+            imageType = MTLX_NODES.get(category, (None, {}))[1].get(steps[0].get("inputName")) or targetType
+
+        texturePattern = textures.renderTexturePattern(udimChannels[channel], convertBitmap)
+        image = nodes[channel] = ShaderNode(channel, "image", imageType)
+        image.inputs["file"] = ("filename", textures.texturePath(asset, texturePattern, settings))
+        info = textures.sourceInfo(asset, channel, settings)
+        image.colorspace = MTLX_COLORSPACES.get(wiringTable.colorspace(wiring.MTLX, channel, texturePattern, info.colorspace if info else None))
+        image.connections["texcoord"] = ("vector2", uv, "out")
+        images[channel] = image
+
+        lastNode = image
+        for step in steps:
+            category = step["type"].replace("mtlx", "", 1)
+            if step.get("shared") and category in sharedNodes:
+                # The node is already in the network, connect the chain to it and stop there
+                sharedNode = sharedNodes[category]
+                sharedInput = step.get("sharedInputName", step.get("inputName", "in"))
+                sharedNode.connections[sharedInput] = (MTLX_NODES.get(category, (None, {}))[1].get(sharedInput) or lastNode.type, lastNode, "out")
+                lastNode = None
+                break
+            outputType, inputTypes = MTLX_NODES.get(category, (None, {}))
+            stepNode = ShaderNode(uniqueName(nodes, step["type"]), category, outputType or lastNode.type)
+            nodes[stepNode.name] = stepNode
+            stepInput = step.get("inputName", "in")
+            stepNode.connections[stepInput] = (inputTypes.get(stepInput) or lastNode.type, lastNode, "out")
+            if step.get("shared"):
+                sharedNodes[category] = stepNode
+            lastNode = stepNode
+        if lastNode is None or combineOnly:
+            continue
+        targetNode.connections[entry["inputName"]] = (targetType, lastNode, "out")
+        connections[channel] = (targetNode, entry["inputName"], lastNode)
+
+    # Combine channels, e.g. multiply AO with BaseColor
+    for channel, image in images.items():
+        combine = (wiringTable.entry(wiring.MTLX, channel) or {}).get("combine")
+        if not combine or combine["with"] not in connections:
+            continue
+        targetNode, inputName, otherNode = connections[combine["with"]]
+        category = combine["node"].replace("mtlx", "", 1)
+        combineNode = ShaderNode(uniqueName(nodes, combine["node"]), category, otherNode.type)
+        nodes[combineNode.name] = combineNode
+        combineNode.connections["in1"] = (otherNode.type, otherNode, "out")
+        combineNode.connections["in2"] = (image.type, image, "out")
+        targetNode.connections[inputName] = (otherNode.type, combineNode, "out")
+    return nodes, surface, displacement
+
+####################### MaterialX #######################
+def mtlxElement(parent, node, prefix=""):
+    element = ET.SubElement(parent, node.category, name=prefix + node.name, type=node.type)
+    for inputName, (inputType, value) in node.inputs.items():
+        inputElement = ET.SubElement(element, "input", name=inputName, type=inputType, value=str(value))
+        if inputName == "file" and node.colorspace:
+            inputElement.set("colorspace", node.colorspace)
+    for inputName, (inputType, sourceNode, output) in node.connections.items():
+        ET.SubElement(element, "input", name=inputName, type=inputType, nodename=prefix + sourceNode.name)
+    return element
+
+def materialxDocument(assets, channels, settings):
+    # One MaterialX document holding the materials of the assets, node names are prefixed by the material name
+    wiringTable = wiring.getWiring(settings.get("wiringFile"))
+    root = ET.Element("materialx", version=MTLX_VERSION)
+    for asset in assets:
+        baseName = textures.materialBaseName(asset, settings)
+        prefix = baseName + "_" if len(assets) > 1 else ""
+        nodes, surface, displacement = mtlxNetwork(asset, channels, wiringTable, settings)
+        for node in nodes.values():
+            mtlxElement(root, node, prefix)
+        material = ET.SubElement(root, "surfacematerial", name=baseName + "_MTL", type="material")
+        ET.SubElement(material, "input", name="surfaceshader", type="surfaceshader", nodename=prefix + surface.name)
+        if displacement is not None:
+            ET.SubElement(material, "input", name="displacementshader", type="displacementshader", nodename=prefix + displacement.name)
+    indent(root)
+    return '<?xml version="1.0"?>\n' + ET.tostring(root, encoding="unicode") + "\n"
+
+def indent(element, level=0):
+    # ElementTree.indent is only available from Python 3.9
+    spacing = "\n" + "  " * level
+    if len(element):
+        element.text = spacing + "  "
+        for child in element:
+            indent(child, level + 1)
+        child.tail = spacing
+    if level and not element.tail:
+        element.tail = spacing
+
+####################### USD #######################
+def usdString(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def usdAsset(path):
+    return "@" + path.replace("\\", "/") + "@"
+
+def usdShader(lines, materialPath, shaderId, name, inputs, outputs, indentation="        "):
+    # inputs : [(usd type, name, value or None, connection path or None)], outputs : [(usd type, name)]
+    lines.append(f'{indentation}def Shader "{name}"')
+    lines.append(f"{indentation}{{")
+    lines.append(f'{indentation}    uniform token info:id = "{shaderId}"')
+    for inputType, inputName, value, connection in inputs:
+        if connection:
+            lines.append(f"{indentation}    {inputType} inputs:{inputName}.connect = <{materialPath}/{connection}>")
+        else:
+            lines.append(f"{indentation}    {inputType} inputs:{inputName} = {value}")
+    for outputType, outputName in outputs:
+        lines.append(f"{indentation}    {outputType} outputs:{outputName}")
+    lines.append(f"{indentation}}}")
+
+def mtlxShaderId(node):
+    # MaterialX node definitions, e.g. ND_image_color3, ND_multiply_color3FA
+    if node.category == "standard_surface":
+        return "ND_standard_surface_surfaceshader"
+    if node.category == "displacement":
+        return "ND_displacement_float"
+    if node.category == "normalmap":
+        return "ND_normalmap"
+    if node.category == "multiply" and node.connections.get("in2", ("",))[0] == "float" and node.type != "float":
+        return f"ND_multiply_{node.type}FA"
+    return f"ND_{node.category}_{node.type}"
+
+def usdMaterialX(lines, materialPath, asset, channels, wiringTable, settings):
+    nodes, surface, displacement = mtlxNetwork(asset, channels, wiringTable, settings)
+    for node in nodes.values():
+        inputs = []
+        for inputName, (inputType, value) in node.inputs.items():
+            if inputType == "filename":
+                # The texture colorspace is stored as metadata of the file input
+                value = usdAsset(value) + (f' (colorSpace = "{node.colorspace}")' if node.colorspace else "")
+                inputs.append(("asset", inputName, value, None))
+            else:
+                inputs.append((USD_TYPES.get(inputType, inputType), inputName, usdString(value), None))
+        for inputName, (inputType, sourceNode, output) in node.connections.items():
+            inputs.append((USD_TYPES.get(inputType, inputType), inputName, None, f"mtlx_{sourceNode.name}.outputs:{output}"))
+        outputType = "token" if node.type in ("surfaceshader", "displacementshader") else USD_TYPES.get(node.type, node.type)
+        outputName = "surface" if node.type == "surfaceshader" else "displacement" if node.type == "displacementshader" else "out"
+        usdShader(lines, materialPath, mtlxShaderId(node), "mtlx_" + node.name, inputs, [(outputType, outputName)])
+    outputs = [f"        token outputs:mtlx:surface.connect = <{materialPath}/mtlx_{surface.name}.outputs:surface>"]
+    if displacement is not None:
+        outputs.append(f"        token outputs:mtlx:displacement.connect = <{materialPath}/mtlx_{displacement.name}.outputs:displacement>")
+    return outputs
+
+def usdPreview(lines, materialPath, asset, channels, wiringTable, settings):
+    # UsdPreviewSurface network, the viewport material
+    baseName = textures.nodeName(asset.baseName)
+    udimChannels = asset.channels()
+    # Same textures as the builder USD Preview material : the sources, or their reduced resolution tier
+    previewTier = textures.previewTextureTier(settings)
+    surfaceInputs = []
+    usdShader(lines, materialPath, "UsdPrimvarReader_float2", "preview_UV", [("string", "varname", '"st"', None)], [("float2", "result")])
+    for channel, entry in wiringTable.plan(wiring.USDPREVIEW, [channel for channel in channels if channel in udimChannels]):
+        if "inputName" not in entry:
+            continue
+        texturePattern = textures.previewTexturePattern(udimChannels[channel], previewTier)
+        info = textures.sourceInfo(asset, channel, settings)
+        colorspace = wiringTable.colorspace(wiring.USDPREVIEW, channel, texturePattern, info.colorspace if info else None)
+        outputName, outputType = PREVIEW_OUTPUTS.get(entry.get("output", 0), ("r", "float"))
+        inputs = [("asset", "file", usdAsset(textures.texturePath(asset, texturePattern, settings)), None),
+                  ("token", "sourceColorSpace", usdString(colorspace), None),
+                  ("float2", "st", None, "preview_UV.outputs:result")]
+        usdShader(lines, materialPath, "UsdUVTexture", "preview_" + channel, inputs, [(outputType, outputName)])
+        inputType = PREVIEW_SURFACE_INPUTS.get(entry["inputName"], "float")
+        surfaceInputs.append((inputType, entry["inputName"], None, f"preview_{channel}.outputs:{outputName}"))
+    usdShader(lines, materialPath, "UsdPreviewSurface", f"preview_{baseName}_surface", surfaceInputs, [("token", "surface")])
+    return [f"        token outputs:surface.connect = <{materialPath}/preview_{baseName}_surface.outputs:surface>"]
+
+def usdaLayer(assets, channels, settings, rootPrim="materials"):
+    # USDA layer with one Material prim per asset : the MaterialX network for Karma, and/or the USD Preview one.
+    # settings["materialList"] picks the networks, like in the material builder
+    wiringTable = wiring.getWiring(settings.get("wiringFile"))
+    materialList = settings.get("materialList", ["Karma Material", "USD Preview Material"])
+    withMaterialX = any("Karma" in material or "MaterialX" in material for material in materialList)
+    withPreview = any("USD Preview Material" in material for material in materialList)
+    lines = ["#usda 1.0", "(", f'    defaultPrim = "{rootPrim}"', ")", "", f'def Scope "{rootPrim}"', "{"]
+    for asset in assets:
+        materialName = textures.materialBaseName(asset, settings) + "_MTL"
+        materialPath = f"/{rootPrim}/{materialName}"
+        lines.append(f'    def Material "{materialName}"')
+        lines.append("    {")
+        # The material outputs come first, then the shaders
+        shaderLines = []
+        if withMaterialX:
+            lines += usdMaterialX(shaderLines, materialPath, asset, channels, wiringTable, settings)
+        if withPreview:
+            lines += usdPreview(shaderLines, materialPath, asset, channels, wiringTable, settings)
+        lines += shaderLines
+        lines.append("    }")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+####################### Export #######################
+def writeFile(path, content):
+    # Write then rename so a reader never sees a half written file
+    tmpPath = f"{path}.{os.getpid()}.tmp"
+    with open(tmpPath, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmpPath, path)
+
+def exportMaterials(assets, channels, outputDirectory, settings, fileFormat=MTLX):
+    # Write one .mtlx or .usda file per asset in outputDirectory, returns the written paths.
+    # settings : materialList, convertBitmap, relativePath, textureFolder, absTextureFolder, wiringFile
+    if not os.path.isdir(outputDirectory):
+        os.makedirs(outputDirectory)
+    paths = []
+    for asset in assets:
+        path = os.path.join(outputDirectory, textures.materialBaseName(asset, settings) + "." + fileFormat)
+        if fileFormat == USDA:
+            writeFile(path, usdaLayer([asset], channels, settings))
+        else:
+            writeFile(path, materialxDocument([asset], channels, settings))
+        paths.append(path)
+    return paths
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Export the materials of a texture folder as MaterialX or USDA files")
+    parser.add_argument("textureFolder")
+    parser.add_argument("outputDirectory")
+    parser.add_argument("--format", choices=[MTLX, USDA], default=MTLX)
+    parser.add_argument("--name", default="", help="Material base name, every material of the folder in batch mode")
+    parser.add_argument("--batch", action="store_true")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--channels", default="", help="Channels to export, all the channels found by default")
+    parser.add_argument("--convert", action="store_true", help="Point to the converted .rat textures")
+    parser.add_argument("--wiring", default=None, help="Channel wiring JSON file")
+    options = parser.parse_args(args)
+
+    textureFolder = os.path.abspath(options.textureFolder)
+    aliasTable = scanner.AliasTable(scanner.CHANNEL_NAMES)
+    depth = None if options.batch or options.recursive else 0
+    collector = scanner.MaterialCollector(None if options.batch else options.name)
+    for directory, entry, texture in scanner.walkTextures(textureFolder, aliasTable, options.name, depth):
+        collector.add(directory, entry, texture)
+    assets = collector.results()
+    channels = options.channels.replace(",", " ").split() or list(scanner.CHANNEL_NAMES)
+    settings = {"convertBitmap": options.convert, "relativePath": False, "absTextureFolder": textureFolder, "wiringFile": options.wiring}
+    paths = exportMaterials(assets, channels, options.outputDirectory, settings, options.format)
+    print(f"Exported {len(paths)} materials to {options.outputDirectory}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
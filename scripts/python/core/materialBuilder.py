@@ -0,0 +1,476 @@
+####################### Material Builder Core #######################
+# Headless material building : no PySide2, usable from hython, PDG or the Fast Material Builder UI.
+#
+#   from core import materialBuilder as mb
+#   assets = mb.scanMaterials("/proj/textures", batch=True)
+#   mb.convertTextures(assets, ["BaseColor", "Normal"])
+#   mb.buildMaterials(hou.node("/mat"), assets, ["BaseColor", "Normal"], {"textureFolder": "$JOB/textures"})
+# Imports
+import os
+import logging
+
+import hou, voptoolutils
+from utils import scanner, scancache, conversion, instrumentation
+from utils.decorators import timer
+from core import wiring, textures
+from core.textures import nodeName, renderTexturePattern, previewTextureTier, previewTexturePattern, sourceInfo, textureSignature
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+KARMA = "Karma Material"
+MATERIALX = "MaterialX"
+USDPREVIEW = "USD Preview Material"
+
+# Masks for the different material subnets : [tab mask, material type, folder label, render context, node prefix]
+MATERIAL_SETUPS = {
+    KARMA: [voptoolutils.KARMAMTLX_TAB_MASK, 'karmamaterial', 'Karma Material Builder', 'kma', 'KMA_'],
+    MATERIALX: [voptoolutils.MTLX_TAB_MASK, 'mtlxmaterial', 'MaterialX Builder', 'mtlx', 'MTLX_'],
+    USDPREVIEW: [voptoolutils.USDPREVIEW_TAB_MASK, 'usdmaterial', 'USD Preview Material Builder', '', 'USD_'],
+    }
+
+# Channel wiring table used by each material (see core.wiring)
+WIRING_TARGETS = {KARMA: wiring.MTLX, MATERIALX: wiring.MTLX, USDPREVIEW: wiring.USDPREVIEW}
+
+def projectVariables():
+    # Values of the variables a texture folder can start with
+    variables = {}
+    prismProject = hou.getenv("PRISMJOB")
+    if prismProject:
+        variables["$PRISMJOB"] = prismProject.rstrip("/")
+    houdiniJob = hou.getenv("JOB")
+    if houdiniJob:
+        variables["$JOB"] = houdiniJob.rstrip("/")
+    hipDir = os.path.dirname(hou.hipFile.path())
+    if hipDir:
+        variables["$HIP"] = hipDir.rstrip("/")
+    return variables
+
+def expandTextureFolder(textureFolder, variables=None):
+    # Change the relative path to the absolute path
+    variables = projectVariables() if variables is None else variables
+    for variable in ("$PRISMJOB", "$JOB", "$HIP"):
+        if variable in textureFolder and variables.get(variable):
+            return textureFolder.replace(variable, variables[variable])
+    return textureFolder
+
+def iterMaterials(collector, absTextureFolder, baseName="", aliasTable=None, depth=None, include=None, exclude=None, useScanCache=True):
+    # Stream (asset, texture) as the textures are found, so a UI can show them progressively.
+    # useScanCache : reuse the listings of the folders that did not change since the last scan (see utils.scancache)
+    aliasTable = aliasTable or scanner.AliasTable(scanner.CHANNEL_NAMES)
+    scanCache = scancache.getScanCache(aliasTable) if useScanCache else None
+    for directory, entry, texture in scanner.walkTextures(absTextureFolder, aliasTable, baseName, depth, include, exclude, scanCache):
+        yield collector.add(directory, entry, texture), texture
+
+def scanMaterials(absTextureFolder, baseName="", batch=False, aliasTable=None, recursive=False, depth=None, include=None, exclude=None, useScanCache=True):
+    # Find the textures of one material, or of every material of the folder tree in batch mode.
+    # Only the texture folder itself is read unless batch or recursive is set
+    if not batch and not recursive:
+        depth = 0
+    collector = scanner.MaterialCollector(None if batch else baseName)
+    for asset, texture in iterMaterials(collector, absTextureFolder, baseName, aliasTable, depth, include, exclude, useScanCache):
+        pass
+    return collector.results()
+
+def foundChannels(assets, channelNames=scanner.CHANNEL_NAMES):
+    # Channels found in at least one asset, in the channel dictionary order
+    assetChannels = set()
+    for asset in assets:
+        assetChannels.update(asset.channels())
+    return [channel for channel in channelNames if channel in assetChannels]
+
+def textureGroups(assets, channels):
+    groups = []
+    for asset in assets:
+        assetChannels = asset.channels()
+        for channel in channels:
+            if channel in assetChannels:
+                groups.append(asset.groups[assetChannels[channel]])
+    return groups
+
+def conversionJobs(assets, channels, renderEngine=None, proxyTiers=None, plan=None):
+    # renderEngine : render engines to convert for, Karma when None
+    # proxyTiers : reduced resolution variants converted with the full textures (see conversion.PROXY_TIERS)
+    # plan : conversion.ConversionPlan shared by the calls of a run, a texture shared by several assets,
+    # materials or render setups is converted once (see conversion.ConversionPlan)
+    conversionSettings = {"renderEngine": list(renderEngine) if renderEngine is not None else ["Karma"],
+                          "proxyTiers": list(proxyTiers) if proxyTiers is not None else []}
+    return conversion.collectConversions(conversionSettings, textureGroups = textureGroups(assets, channels), plan = plan)
+
+def convertTextures(assets, channels, renderEngine=None, workers=None, proxyTiers=None, reportPath=None, memoryBudget=None, plan=None):
+    # Convert the textures of the selected channels and wait for the conversions (farm, PDG).
+    # reportPath : optional JSON file receiving the per-file timings (see utils.instrumentation)
+    # memoryBudget : bytes of memory the simultaneous conversions can use (see utils.scheduling)
+    jobs = conversionJobs(assets, channels, renderEngine, proxyTiers, plan)
+    conversion.ConversionPool(maxWorkers = workers, memoryBudget = memoryBudget).run(jobs)
+    if reportPath:
+        instrumentation.ConversionReport(jobs).write(reportPath)
+    return jobs
+
+def expandedSettings(settings):
+    # settings with absTextureFolder, the texture folder variables expanded with the Houdini session ones
+    if settings.get("textureFolder") and not settings.get("absTextureFolder"):
+        settings = dict(settings, absTextureFolder = expandTextureFolder(settings["textureFolder"]))
+    return settings
+
+def texturePath(asset, texturePattern, settings):
+    # Path to the texture channel, relative to the texture folder variables if asked
+    if settings.get("relativePath", True):
+        settings = expandedSettings(settings)
+    return textures.texturePath(asset, texturePattern, settings)
+
+def setTexture(textureNode, asset, channel, texturePattern, wiringTable, wiringTarget, settings):
+    # Set path to texture, colorspace and signature, completed with the header of the source texture
+    info = sourceInfo(asset, channel, settings)
+    textureNode.parm("file").set(texturePath(asset, texturePattern, settings))
+    colorspaceParm = wiringTable.target(wiringTarget).get("colorspaceParm")
+    if colorspaceParm:
+        textureNode.parm(colorspaceParm).set(wiringTable.colorspace(wiringTarget, channel, texturePattern, info.colorspace if info else None))
+    signature = textureSignature(wiringTable.entry(wiringTarget, channel) or {}, info)
+    if signature and textureNode.parm("signature") is not None:
+        textureNode.parm("signature").set(signature)
+
+def wireChannels(matNet, surfaceNode, uvNode, asset, channels, wiringTable, wiringTarget, patternFunc, settings):
+    # Create and connect the texture node of every channel following the wiring table, in one pass
+    udimChannels = asset.channels()
+    targetWiring = wiringTable.target(wiringTarget)
+    sharedNodes = {}
+    textureNodes = {}
+    connections = {}
+    for channel, entry in wiringTable.plan(wiringTarget, [channel for channel in channels if channel in udimChannels]):
+        texturePattern = patternFunc(udimChannels[channel])
+        textureNode = matNet.node(channel)
+        if textureNode is not None:
+            # Channel already built (material update), only follow its texture
+            updateTexture(textureNode, asset, channel, texturePattern, wiringTable, wiringTarget, settings)
+            continue
+        textureNode = matNet.createNode(targetWiring["textureNode"], channel)
+        textureNodes[channel] = textureNode
+        setTexture(textureNode, asset, channel, texturePattern, wiringTable, wiringTarget, settings)
+
+        # Connect the texture node to the UV node
+        textureNode.setInput(targetWiring["uvInput"], uvNode)
+
+        # Connect the texture node to the surface node, through its intermediate nodes
+        lastNode = textureNode
+        for step in entry.get("nodes", []):
+            if step.get("shared") and step["type"] not in sharedNodes:
+                existingNode = findNodeOfType(matNet, step["type"])
+                if existingNode is not None:
+                    sharedNodes[step["type"]] = existingNode
+            if step.get("shared") and step["type"] in sharedNodes:
+                sharedNodes[step["type"]].setInput(step.get("sharedInput", step.get("input", 0)), lastNode)
+                lastNode = None
+                break
+            stepNode = matNet.createNode(step["type"])
+            stepNode.setInput(step.get("input", 0), lastNode)
+            if step.get("shared"):
+                sharedNodes[step["type"]] = stepNode
+            lastNode = stepNode
+        if lastNode is None or "input" not in entry:
+            continue
+        targetNode = matNet.node(entry["target"]) if entry.get("target") else surfaceNode
+        if targetNode is None:
+            logger.warning(f"{matNet.path()}: no {entry['target']} node to connect {channel} to, it is left unconnected")
+            continue
+        targetNode.setInput(entry["input"], lastNode, entry.get("output", 0))
+        connections[channel] = (targetNode, lastNode)
+
+    # Combine channels, e.g. multiply AO with BaseColor
+    for channel, textureNode in textureNodes.items():
+        combine = wiringTable.entry(wiringTarget, channel) or {}
+        combine = combine.get("combine")
+        if not combine:
+            continue
+        otherEntry = wiringTable.entry(wiringTarget, combine["with"])
+        if combine["with"] in connections:
+            targetNode, otherNode = connections[combine["with"]]
+        else:
+            # Channel added to an existing material, combine it with the texture already connected
+            otherNode = matNet.node(combine["with"])
+            if otherNode is None or otherEntry.get("nodes") or "input" not in otherEntry:
+                continue
+            targetNode = matNet.node(otherEntry["target"]) if otherEntry.get("target") else surfaceNode
+        combineNode = matNet.createNode(combine["node"])
+        combineNode.setInput(0, otherNode)
+        combineNode.setInput(1, textureNode)
+        targetNode.setInput(otherEntry["input"], combineNode)
+    return textureNodes
+
+def findNodeOfType(matNet, typeName):
+    for child in matNet.children():
+        if child.type().name() == typeName:
+            return child
+    return None
+
+def updateTexture(textureNode, asset, channel, texturePattern, wiringTable, wiringTarget, settings):
+    # Repath the texture when its file changed, its colorspace and signature follow the new file.
+    # A texture still pointing to the same file is left untouched : no cook, and the manual tweaks survive
+    path = texturePath(asset, texturePattern, settings)
+    if textureNode.parm("file").unexpandedString() == path:
+        return
+    setTexture(textureNode, asset, channel, texturePattern, wiringTable, wiringTarget, settings)
+
+def removeChannel(textureNode, entry, surfaceNode):
+    # Remove a texture node and the intermediate nodes only used by it
+    combine = entry.get("combine")
+    removableTypes = {step["type"] for step in entry.get("nodes", [])}
+    if combine:
+        removableTypes.add(combine["node"])
+    downstream = list(textureNode.outputs())
+    textureNode.destroy()
+    while downstream:
+        node = downstream.pop()
+        if node == surfaceNode or node.type().name() not in removableTypes:
+            continue
+        if combine and node.type().name() == combine["node"] and node.input(0) is not None:
+            # Connect the other channel back in place of the combining node
+            for connection in node.outputConnections():
+                connection.outputNode().setInput(connection.inputIndex(), node.input(0))
+            node.destroy()
+        elif all(nodeInput is None for nodeInput in node.inputs()):
+            downstream += node.outputs()
+            node.destroy()
+
+def displacementNode(matNet):
+    # Displacement node of a Karma / MaterialX material, removed when it was built without displacement map :
+    # created again with its subnet output when a displacement map shows up
+    node = matNet.node("mtlxdisplacement")
+    if node is not None:
+        return node
+    node = matNet.createNode("mtlxdisplacement", "mtlxdisplacement")
+    displacementOutput = matNet.node("displacement_output")
+    if displacementOutput is None:
+        displacementOutput = matNet.createNode("subnetconnector", "displacement_output")
+        displacementOutput.parm("connectorkind").set("output")
+        displacementOutput.parm("parmname").set("displacement")
+        displacementOutput.parm("parmlabel").set("Displacement")
+        displacementOutput.parm("parmtype").set("displacement")
+    displacementOutput.setInput(0, node)
+    return node
+
+def updateMaterial(matNet, kind, asset, channels, convertBitmap, settings):
+    # Patch a material built before : repath the channels already there, build the new ones and remove
+    # the channels whose textures are gone. Other nodes and parameters (manual tweaks) are left untouched
+    wiringTarget = WIRING_TARGETS[kind]
+    wiringTable = wiring.getWiring(settings.get("wiringFile"))
+    targetWiring = wiringTable.target(wiringTarget)
+    surfaceNode = matNet.node(nodeName(asset.baseName) + "_surface") or findNodeOfType(matNet, targetWiring["surfaceNode"])
+    uvNode = findNodeOfType(matNet, "usdtransform2d")
+    if surfaceNode is None or uvNode is None:
+        logger.warning(f"{matNet.path()} was not built by the Fast Material Builder, it is left untouched")
+        return matNet
+
+    # Texture nodes are named after their channel, the other texture nodes were added by hand
+    udimChannels = asset.channels()
+    knownChannels = set(scanner.CHANNEL_NAMES) | set(targetWiring["channels"])
+    for textureNode in matNet.children():
+        channel = textureNode.name()
+        if channel in knownChannels and channel not in udimChannels and textureNode.type().name() == targetWiring["textureNode"]:
+            removeChannel(textureNode, wiringTable.entry(wiringTarget, channel) or {}, surfaceNode)
+
+    if kind != USDPREVIEW and "Displacement" in channels and "Displacement" in udimChannels and matNet.node("Displacement") is None:
+        displacementNode(matNet)
+
+    if kind == USDPREVIEW:
+        previewTier = previewTextureTier(settings)
+        patternFunc = lambda texturePattern: previewTexturePattern(texturePattern, previewTier)
+    else:
+        patternFunc = lambda texturePattern: renderTexturePattern(texturePattern, convertBitmap if kind == KARMA else False)
+    existingNodes = set(matNet.children())
+    wireChannels(matNet, surfaceNode, uvNode, asset, channels, wiringTable, wiringTarget, patternFunc, settings)
+    for node in matNet.children():
+        if node not in existingNodes:
+            node.moveToGoodPosition()
+    return matNet
+
+def materialName(asset, kind, settings):
+    # Name of the material subnet of an asset, e.g. KMA_Wood_MTL, or KMA_oak_Wood_MTL for the Wood textures
+    # of the oak subfolder in a batch (see textures.materialBaseName). Used to build the material and to find it again
+    return MATERIAL_SETUPS[kind][4] + textures.materialBaseName(asset, expandedSettings(settings)) + "_MTL"
+
+def existingMaterial(target, asset, material, settings):
+    # Material subnet built before for this asset, if any
+    kind = materialKind(material)
+    return target.node(materialName(asset, kind, settings)) if kind else None
+
+def findMaterialContainer(networks, assets, materialList, settings):
+    # Network holding materials built before for these assets (update mode) : the first network given,
+    # or one of its sub networks. None when no material of the assets exists yet
+    names = {materialName(asset, materialKind(material), settings) for asset in assets for material in materialList if materialKind(material)}
+    for network in networks:
+        if network is None:
+            continue
+        if any(network.node(name) is not None for name in names):
+            return network
+        for node in network.allSubChildren():
+            if node.name() in names:
+                return node.parent()
+    return None
+
+def VopNetSetup(matNet, materialType:str, matMask:str, folderLabel:str, renderCtxt:str):
+    voptoolutils._setupMtlXBuilderSubnet(matNet, materialType, materialType, matMask, folderLabel, renderCtxt)
+
+def createRenderMaterials(target, asset, channels, matSetup, convertBitmap, settings):
+    # Create Karma / MaterialX material subnet
+    baseName = nodeName(asset.baseName)
+    wiringTable = wiring.getWiring(settings.get("wiringFile"))
+
+    kind = KARMA if matSetup == MATERIAL_SETUPS[KARMA] else MATERIALX
+    matNet = target.createNode("subnet", materialName(asset, kind, settings))
+    if matSetup != MATERIAL_SETUPS[USDPREVIEW]:
+        VopNetSetup(matNet, matSetup[1], matSetup[0], matSetup[2], matSetup[3])
+
+    # Rename the mtlxstandard_surface node
+    surfaceNode = matNet.node("mtlxstandard_surface")
+    surfaceNode.setName(baseName + "_surface")
+
+    # Create mtlxtexcoord node inside the subnet
+    UVNode = matNet.createNode("mtlxtexcoord", "UV")
+    UVNode.parm("signature").set("vector2")
+    transform2DNode = matNet.createNode("usdtransform2d")
+    transform2DNode.setInput(0, UVNode, 0)
+
+    # Add textures nodes for selected channels
+    wireChannels(matNet, surfaceNode, transform2DNode, asset, channels, wiringTable, wiring.MTLX,
+                 lambda texturePattern: renderTexturePattern(texturePattern, convertBitmap), settings)
+
+    # If there is no displacement map, remove the displacement node
+    if matNet.node("Displacement") is None:
+        matNet.node("mtlxdisplacement").destroy()
+        displacementOutput = matNet.node("displacement_output")
+        if displacementOutput:
+            displacementOutput.destroy()
+
+    matNet.layoutChildren()
+    matNet.moveToGoodPosition()
+    return matNet
+
+def createUSDPreviewMat(target, asset, channels, matSetup, settings):
+    # Create USD Material Preview Subnet
+    baseName = nodeName(asset.baseName)
+    wiringTable = wiring.getWiring(settings.get("wiringFile"))
+    previewTier = previewTextureTier(settings)
+
+    matNet = target.createNode("subnet", materialName(asset, USDPREVIEW, settings))
+    voptoolutils._setupUsdPreviewBuilderSubnet(matNet, matSetup[1], matSetup[1], matSetup[0], matSetup[2])
+
+    # Rename the surface node
+    surfaceNode = matNet.node("usdpreviewsurface")
+    surfaceNode.setName(baseName + "_surface")
+
+    # Add the UV node
+    UVNode = matNet.createNode("usdprimvarreader",'UV')
+    UVNode.parm("signature").set("float2")
+    UVNode.parm("varname").set("st")
+    # Add a transform2D Node
+    transform2DNode = matNet.createNode("usdtransform2d")
+    transform2DNode.setInput(0, UVNode, 0)
+
+    # Add textures nodes for selected channels
+    wireChannels(matNet, surfaceNode, transform2DNode, asset, channels, wiringTable, wiring.USDPREVIEW,
+                 lambda texturePattern: previewTexturePattern(texturePattern, previewTier), settings)
+
+    matNet.layoutChildren()
+    matNet.moveToGoodPosition()
+    return matNet
+
+def materialKind(material):
+    # KARMA, MATERIALX or USDPREVIEW for an entry of the materialList
+    if "Karma" in material:
+        return KARMA
+    elif "MaterialX" in material:
+        return MATERIALX
+    elif "USD Preview Material" in material:
+        return USDPREVIEW
+    return None
+
+def buildMaterial(target, asset, channels, material, convertBitmap, settings):
+    # Build one material of the materialList for an asset, node by node
+    kind = materialKind(material)
+    if kind == KARMA:
+        return createRenderMaterials(target, asset, channels, MATERIAL_SETUPS[KARMA], convertBitmap, settings)
+    elif kind == MATERIALX:
+        return createRenderMaterials(target, asset, channels, MATERIAL_SETUPS[MATERIALX], False, settings)
+    elif kind == USDPREVIEW:
+        return createUSDPreviewMat(target, asset, channels, MATERIAL_SETUPS[USDPREVIEW], settings)
+    return None
+
+class MaterialTemplates:
+    # The first material built for a render setup and a set of channels is kept as a template.
+    # The next assets with the same channels copy it and only patch their names, file paths and colorspaces,
+    # instead of creating and wiring every node again
+    def __init__(self, target, settings):
+        self.target = target
+        self.settings = settings
+        self.templates = {}
+
+    def build(self, asset, channels, material, convertBitmap):
+        kind = materialKind(material)
+        if kind is None:
+            return None
+        convertBitmap = convertBitmap if kind == KARMA else False
+        assetChannels = asset.channels()
+        channelSet = tuple(channel for channel in channels if channel in assetChannels)
+        key = (kind, convertBitmap, channelSet)
+        template = self.templates.get(key)
+        if template is None:
+            matNet = buildMaterial(self.target, asset, channels, material, convertBitmap, self.settings)
+            if matNet is not None:
+                self.templates[key] = (matNet, asset)
+            return matNet
+        return self.instance(template, kind, asset, channelSet, convertBitmap)
+
+    def instance(self, template, kind, asset, channelSet, convertBitmap):
+        templateNet, templateAsset = template
+        baseName = nodeName(asset.baseName)
+        matNet = templateNet.copyTo(self.target)
+        matNet.setName(materialName(asset, kind, self.settings), unique_name=True)
+        surfaceNode = matNet.node(nodeName(templateAsset.baseName) + "_surface")
+        if surfaceNode is not None:
+            surfaceNode.setName(baseName + "_surface", unique_name=True)
+
+        assetChannels = asset.channels()
+        previewTier = previewTextureTier(self.settings)
+        wiringTable = wiring.getWiring(self.settings.get("wiringFile"))
+        for channel in channelSet:
+            # Some channels are removed from the USD Preview material
+            textureNode = matNet.node(channel)
+            if textureNode is None:
+                continue
+            if kind == USDPREVIEW:
+                texturePattern = previewTexturePattern(assetChannels[channel], previewTier)
+            else:
+                texturePattern = renderTexturePattern(assetChannels[channel], convertBitmap)
+            setTexture(textureNode, asset, channel, texturePattern, wiringTable, WIRING_TARGETS[kind], self.settings)
+        matNet.moveToGoodPosition()
+        return matNet
+
+@timer("buildMaterials")
+def buildMaterials(target, assets, channels, settings):
+    # Build the materials of every asset inside target, in a single undo block.
+    # settings : materialList, convertBitmap, previewTier, relativePath, textureFolder, absTextureFolder,
+    # useTemplates (default True : copy the materials already built for the same channels, see MaterialTemplates),
+    # update (patch the materials already in target instead of building new ones, see updateMaterial),
+    # probeTextures (default True : read the texture headers for the signatures and colorspaces, see utils.probe)
+    materialList = settings.get("materialList", [KARMA])
+    convertBitmap = settings.get("convertBitmap", False)
+    templates = MaterialTemplates(target, settings) if settings.get("useTemplates", True) else None
+    update = settings.get("update", False)
+    materials = []
+    with hou.undos.group("Fast Material Builder"):
+        for asset in assets:
+            if settings.get("probeTextures", True):
+                for path, reason in textures.tileMismatches(asset, channels):
+                    logger.warning(f"Mismatched UDIM tile {path}: {reason}")
+            for material in materialList:
+                # Build time per material type, see instrumentation.timingSummary()
+                with instrumentation.Stopwatch(f"material.{material}"):
+                    matNet = existingMaterial(target, asset, material, settings) if update else None
+                    if matNet is not None:
+                        materials.append(updateMaterial(matNet, materialKind(material), asset, channels, convertBitmap, settings))
+                    elif templates:
+                        materials.append(templates.build(asset, channels, material, convertBitmap))
+                    else:
+                        materials.append(buildMaterial(target, asset, channels, material, convertBitmap, settings))
+    return [material for material in materials if material is not None]
@@ -0,0 +1,78 @@
+####################### Texture Paths #######################
+# Texture path helpers shared by the material builder and the exporters, without any Houdini module
+# Imports
+import os
+import re
+
+from utils import probe, conversion
+
+def nodeName(name):
+    return re.sub(r"[^\w.\-]", "_", name)
+
+def materialBaseName(asset, settings):
+    # Name of the material of an asset : its base name, prefixed by its folder relative to the texture folder
+    # (settings["absTextureFolder"]) so the assets sharing a base name in a batch get their own material
+    name = asset.baseName
+    absTextureFolder = settings.get("absTextureFolder") or os.path.expandvars(settings.get("textureFolder", ""))
+    if absTextureFolder:
+        try:
+            relativeDir = os.path.relpath(asset.directory, absTextureFolder)
+        except ValueError:
+            # Other drive
+            relativeDir = "."
+        if relativeDir != "." and not relativeDir.startswith(".."):
+            name = relativeDir.replace("\\", "/").replace("/", "_") + "_" + name
+    return nodeName(name)
+
+def texturePath(asset, texturePattern, settings):
+    # Path to the texture channel, relative to the texture folder variables if asked.
+    # absTextureFolder is the expanded textureFolder, environment variables are expanded when it is missing
+    textureFolder = settings.get("textureFolder", "")
+    if settings.get("relativePath", True) and textureFolder:
+        absTextureFolder = settings.get("absTextureFolder") or os.path.expandvars(textureFolder)
+        relativeDir = os.path.relpath(asset.directory, absTextureFolder)
+        if relativeDir != ".":
+            textureFolder = os.path.join(textureFolder, relativeDir).replace("\\", "/")
+        return os.path.join(textureFolder, texturePattern)
+    return os.path.join(asset.directory, texturePattern)
+
+def sourceInfo(asset, channel, settings):
+    # Header of the first source texture of the channel (see utils.probe), None when probing is disabled (settings["probeTextures"])
+    if not settings.get("probeTextures", True):
+        return None
+    pattern = asset.channels().get(channel)
+    group = asset.groups.get(pattern) if pattern else None
+    files = group.files() if group else []
+    return probe.probe(files[0]) if files else None
+
+def textureSignature(entry, info):
+    # Signature of the wiring table, or the one of the file channels when the table has none
+    return entry.get("signature") or (info.signature() if info else None)
+
+def tileMismatches(asset, channels):
+    # [(path, reason)] of the UDIM tiles whose channel count or bit depth differ from the first tile of their texture
+    mismatches = []
+    assetChannels = asset.channels()
+    for channel in channels:
+        group = asset.groups.get(assetChannels.get(channel))
+        if group is not None and group.isUdim():
+            mismatches += probe.tileMismatches(group.files())
+    return mismatches
+
+def renderTexturePattern(texturePattern, convertBitmap):
+    # If convertBitmap is True, use the converted textures
+    if convertBitmap is True:
+        # Check if the texture is a .rat file
+        if not texturePattern.endswith(".rat"):
+            # Replace the file extension with .rat
+            texturePattern = texturePattern.rsplit('.', 1)[0] + ".rat"
+    return texturePattern
+
+def previewTextureTier(settings):
+    return settings.get("previewTier") if settings.get("convertBitmap", False) else None
+
+def previewTexturePattern(texturePattern, previewTier):
+    # Point the viewport to a reduced resolution tier when asked, Karma keeps the full textures
+    if previewTier:
+        texturePattern = conversion.proxyFile(texturePattern.rsplit('.', 1)[0] + ".rat", previewTier)
+    return texturePattern
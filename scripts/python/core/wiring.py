@@ -0,0 +1,164 @@
+####################### Channel Wiring #######################
+# How each texture channel is wired into the materials, per render target.
+# The default table can be extended or replaced by a JSON file with the same layout,
+# given by settings["wiringFile"] or the GTTOOLS_WIRING environment variable :
+#   {"mtlx": {"channels": {"Sheen": {"signature": "float", "input": 19, "inputName": "sheen"}}}}
+#
+# Channel entries :
+#   signature   : texture node signature (color3, float, vector3...), node default when missing
+#   colorspace  : colorspace forced for the channel, guessed from the file name when missing
+#   nodes       : intermediate nodes between the texture and the target, in order.
+#                 {"type", "input", "inputName"} : the previous node is connected to this input.
+#                 "shared" : a node of that type already created for the material is reused,
+#                 the previous node is then connected to "sharedInput" (by name : "sharedInputName") and the chain stops there
+#   target      : node receiving the channel, the surface node when missing
+#   input       : target input index, inputName : the same input by name (MaterialX/USD export)
+#   output      : output index of the last node connected to the target (default 0)
+#   combine     : {"node", "with"} : multiply with the "with" channel, the result replaces it on its input
+#   skip        : the channel is not used for this target
+# Channels missing from a target get an unconnected texture node.
+# Imports
+import os
+import json
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+WIRING_ENV = "GTTOOLS_WIRING"
+MTLX = "mtlx"
+USDPREVIEW = "usdpreview"
+
+DEFAULT_WIRING = {
+    MTLX: {
+        "textureNode": "mtlximage",
+        "surfaceNode": "mtlxstandard_surface",
+        "uvInput": 3,
+        "colorspaceParm": "filecolorspace",
+        # File name token -> colorspace, checked in order
+        "colorspaces": {"sRGB": "srgb_tx", "ACEScg": "ACEScg"},
+        "defaultColorspace": "Raw",
+        "channels": {
+            "BaseColor": {"signature": "color3", "input": 1, "inputName": "base_color"},
+            "AO": {"signature": "float", "combine": {"node": "mtlxmultiply", "with": "BaseColor"}},
+            "Specular": {"signature": "float", "input": 4, "inputName": "specular"},
+            "SpecularColor": {"input": 5, "inputName": "specular_color"},
+            "SpecularRoughness": {"signature": "float", "input": 6, "inputName": "specular_roughness"},
+            "Metallic": {"signature": "float", "input": 3, "inputName": "metalness"},
+            "Normal": {"signature": "vector3", "nodes": [{"type": "mtlxnormalmap", "input": 0, "inputName": "in", "shared": True, "sharedInput": 0,
+                                                        "sharedInputName": "in"}],
+                       "input": 40, "inputName": "normal"},
+            "Bump": {"nodes": [{"type": "mtlxbump", "input": 0, "inputName": "height"}], "input": 40, "inputName": "normal"},
+            "Displacement": {"signature": "float", "target": "mtlxdisplacement", "input": 0, "inputName": "displacement"},
+            "Opacity": {"signature": "color3", "input": 38, "inputName": "opacity"},
+            "Subsurface": {"input": 29, "inputName": "subsurface"},
+            "SubsurfaceColor": {"input": 30, "inputName": "subsurface_color"},
+            "SubsurfaceRadius": {"input": 31, "inputName": "subsurface_radius"},
+            "Emissive": {"signature": "color3", "input": 34, "inputName": "emission"},
+            "EmissiveColor": {"input": 35, "inputName": "emission_color"},
+            "Glossiness": {"nodes": [{"type": "mtlxinvert", "input": 0, "inputName": "in"}], "input": 6, "inputName": "specular_roughness"},
+            "Height": {"signature": "float", "nodes": [{"type": "mtlxheighttonormal", "input": 0, "inputName": "in"},
+                                                       {"type": "mtlxnormalmap", "input": 0, "inputName": "in", "shared": True, "sharedInput": 3,
+                                                        "sharedInputName": "normal"}],
+                       "input": 40, "inputName": "normal"},
+            },
+        },
+    USDPREVIEW: {
+        "textureNode": "usduvtexture",
+        "surfaceNode": "usdpreviewsurface",
+        "uvInput": 1,
+        "colorspaceParm": "sourceColorSpace",
+        "colorspaces": {"sRGB": "sRGB"},
+        "defaultColorspace": "raw",
+        "channels": {
+            "BaseColor": {"input": 0, "output": 4, "inputName": "diffuseColor"},
+            # USD Preview Surface is currently bugged with Python
+            "AO": {"skip": True},
+            "Specular": {"skip": True},
+            "SpecularRoughness": {"input": 5, "inputName": "roughness"},
+            "Metallic": {"input": 4, "inputName": "metallic"},
+            # For better viewport visualization
+            "Normal": {"skip": True},
+            "Opacity": {"input": 8, "inputName": "opacity"},
+            "EmissiveColor": {"input": 1, "output": 4, "inputName": "emissiveColor"},
+            },
+        },
+    }
+
+def mergeWiring(base, override):
+    # Per target and per channel merge, a channel entry of the override replaces the default one
+    data = copy.deepcopy(base)
+    for target, targetWiring in override.items():
+        merged = data.setdefault(target, {"channels": {}})
+        for key, value in targetWiring.items():
+            if key == "channels":
+                merged.setdefault("channels", {}).update(value)
+            else:
+                merged[key] = value
+    return data
+
+class WiringTable:
+    # Wiring of every render target, with the channel order precomputed so a material is wired in one pass
+    def __init__(self, data=DEFAULT_WIRING):
+        self.data = data
+        self.order = {target: {channel: index for index, channel in enumerate(targetWiring.get("channels", {}))}
+                      for target, targetWiring in data.items()}
+
+    def target(self, target):
+        return self.data[target]
+
+    def entry(self, target, channel):
+        return self.data[target]["channels"].get(channel)
+
+    def plan(self, target, channels):
+        # [(channel, entry)] of the channels to build, in the table order (Normal before Height...)
+        # Channels missing from the table come last with an empty entry
+        order = self.order[target]
+        wiring = self.data[target]["channels"]
+        plan = [(channel, wiring.get(channel, {})) for channel in channels if not wiring.get(channel, {}).get("skip")]
+        plan.sort(key=lambda item: order.get(item[0], len(order)))
+        return plan
+
+    def isColor(self, target, channel):
+        return self.data[target]["channels"].get(channel, {}).get("signature") in ("color3", "color4")
+
+    def colorspace(self, target, channel, texturePattern, embedded=None):
+        # Forced colorspace, then the file name token, then the colorspace embedded in the file (see utils.probe).
+        # The embedded one is only used for color channels, painting tools tag their data maps as sRGB too
+        targetWiring = self.data[target]
+        forced = targetWiring["channels"].get(channel, {}).get("colorspace")
+        if forced:
+            return forced
+        colorspaces = targetWiring.get("colorspaces", {})
+        for token, colorspace in colorspaces.items():
+            if token in texturePattern:
+                return colorspace
+        if embedded and self.isColor(target, channel):
+            for token, colorspace in colorspaces.items():
+                if token.lower() == embedded.lower():
+                    return colorspace
+        return targetWiring.get("defaultColorspace", "")
+
+# Tables loaded from JSON, by path and modification time
+loadedTables = {}
+
+def loadWiring(path):
+    with open(path, "r") as f:
+        return WiringTable(mergeWiring(DEFAULT_WIRING, json.load(f)))
+
+def getWiring(path=None):
+    # Wiring table of settings["wiringFile"], GTTOOLS_WIRING or the default table
+    path = path or os.getenv(WIRING_ENV, "")
+    if not path:
+        return defaultTable
+    try:
+        key = (path, os.path.getmtime(path))
+        if key not in loadedTables:
+            loadedTables[key] = loadWiring(path)
+        return loadedTables[key]
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load channel wiring {path}, using the default wiring: {e}")
+        return defaultTable
+
+defaultTable = WiringTable()
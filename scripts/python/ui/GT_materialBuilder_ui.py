@@ -2,12 +2,13 @@ import getpass
 import hou
 
 from PySide2.QtCore import Qt, QSize, Signal
-from PySide2.QtGui import QStandardItemModel, QStandardItem, QIcon
+from PySide2.QtGui import QStandardItemModel, QStandardItem
 from PySide2.QtWidgets import (
-    QVBoxLayout, QListView, QPushButton, QDialog, QLineEdit, QLabel, QCheckBox, QHBoxLayout, QProgressDialog
+    QVBoxLayout, QListView, QPushButton, QDialog, QLineEdit, QLabel, QCheckBox, QHBoxLayout, QProgressDialog, QSpinBox, QComboBox
 )
 import ui.collapsibleSection as collapsibleSection
-from ui.ui_utils import getIconPath
+from ui.channelModel import ChannelListModel, ChannelFilterModel
+from ui.ui_utils import getIcon
 
 Section = collapsibleSection.Section
 
@@ -19,6 +20,8 @@ except ImportError:
 # Tooltip durations
 tooltipShort = 5000
 tooltipLong = 8000
+# Rows of the channel list shown without scrolling
+MAX_VISIBLE_ROWS = 20
 
 class mainWindow(QDialog):
 
@@ -57,7 +60,7 @@ class mainWindow(QDialog):
         self.floatingChooserBut = QPushButton()
         self.floatingChooserBut.setStyleSheet("QPushButton { margin: 1px; border: none;}")
         self.floatingChooserBut.setFixedSize(45, 45)
-        self.floatingChooserIcon = QIcon(getIconPath("chooser_folder.svg"))
+        self.floatingChooserIcon = getIcon("chooser_folder.svg")
         self.floatingChooserBut.setIcon(self.floatingChooserIcon)
         self.floatingChooserBut.setIconSize(QSize(30, 30))
 
@@ -78,6 +81,43 @@ class mainWindow(QDialog):
         self.chckrelativePath.setToolTip("Replace the textures absolute paths by their environment variables relatives")
         self.chckrelativePath.setToolTipDuration(tooltipLong)
 
+        #Batch mode checkbox
+        self.chckBatchMode = QCheckBox("Build every material of the folder tree")
+        self.chckBatchMode.setCheckable(True)
+        self.chckBatchMode.setChecked(False)
+        self.chckBatchMode.setToolTip("Find every material base name in the texture folder and its subfolders and build them all at once. The base material name filters the textures when set")
+        self.chckBatchMode.setToolTipDuration(tooltipLong)
+
+        #Update existing materials
+        self.chckUpdate = QCheckBox("Update existing materials")
+        self.chckUpdate.setCheckable(True)
+        self.chckUpdate.setChecked(False)
+        self.chckUpdate.setToolTip("Patch the materials already in the network instead of creating new ones : only the added, moved or removed textures are changed, manual tweaks are kept")
+        self.chckUpdate.setToolTipDuration(tooltipLong)
+
+        #Subfolders search
+        self.chckRecursive = QCheckBox("Search subfolders")
+        self.chckRecursive.setCheckable(True)
+        self.chckRecursive.setChecked(False)
+        self.chckRecursive.setToolTip("Look for the textures in the subfolders of the texture folder too")
+        self.chckRecursive.setToolTipDuration(tooltipShort)
+
+        self.depthTitle = QLabel("Max depth")
+        self.depthSpin = QSpinBox()
+        self.depthSpin.setRange(0, 32)
+        self.depthSpin.setSpecialValueText("Unlimited")
+        self.depthSpin.setToolTip("Number of subfolder levels searched")
+        self.depthSpin.setToolTipDuration(tooltipShort)
+
+        self.includeGlobs = QLineEdit()
+        self.includeGlobs.setPlaceholderText("Include (e.g. *.exr 4k/*)")
+        self.includeGlobs.setToolTip("Only use the files matching these patterns")
+        self.includeGlobs.setToolTipDuration(tooltipShort)
+        self.excludeGlobs = QLineEdit()
+        self.excludeGlobs.setPlaceholderText("Exclude (e.g. 8k *_preview*)")
+        self.excludeGlobs.setToolTip("Skip the files and folders matching these patterns")
+        self.excludeGlobs.setToolTipDuration(tooltipShort)
+
         #Material Engines List Title
         self.materialEnginesTitle = QLabel("Material List")
         self.materialEnginesTitle.setToolTip("Select the materials for the different render engines")
@@ -132,6 +172,19 @@ class mainWindow(QDialog):
         advancedOptionsLyt.addWidget(self.materialEnginesTitle)
         advancedOptionsLyt.addWidget(self.selMaterialEngines)
         advancedOptionsLyt.addWidget(self.chckrelativePath)
+        advancedOptionsLyt.addWidget(self.chckBatchMode)
+        advancedOptionsLyt.addWidget(self.chckUpdate)
+
+        recursiveLyt = QHBoxLayout()
+        recursiveLyt.addWidget(self.chckRecursive)
+        recursiveLyt.addWidget(self.depthTitle)
+        recursiveLyt.addWidget(self.depthSpin)
+        advancedOptionsLyt.addLayout(recursiveLyt)
+
+        globsLyt = QHBoxLayout()
+        globsLyt.addWidget(self.includeGlobs)
+        globsLyt.addWidget(self.excludeGlobs)
+        advancedOptionsLyt.addLayout(globsLyt)
 
         self.advancedOptionSec.setContentLayout(advancedOptionsLyt)
 
@@ -181,6 +234,9 @@ class mainWindow(QDialog):
         else:
             relativePath = False
 
+        # Build every material of the folder tree
+        batchMode = self.chckBatchMode.isChecked()
+
         # Create USD Preview Material
         if self.chckUSDPreview.isChecked():
             materialList.append("USD Preview Material")
@@ -189,6 +245,12 @@ class mainWindow(QDialog):
                      "textureFolder" : textureFolder,
                      "materialList" : materialList,
                      "relativePath" : relativePath,
+                     "batchMode" : batchMode,
+                     "update" : self.chckUpdate.isChecked(),
+                     "recursive" : self.chckRecursive.isChecked(),
+                     "depth" : self.depthSpin.value() or None,
+                     "include" : self.includeGlobs.text(),
+                     "exclude" : self.excludeGlobs.text(),
                     }
         self.confirm.emit(settings)
 
@@ -208,10 +270,20 @@ class channelSelWindow(QDialog):
         self.setWindowTitle("Choose the textures channels")
 
     def widgets(self):
-        # Channel selection list
+        # Channel selection list, the rows are read from the scan results when shown
         self.channelSelList = QListView()
-        self.channelModel = QStandardItemModel(self.channelSelList)
-        self.channelSelList.setModel(self.channelModel)
+        self.channelSelList.setUniformItemSizes(True)
+        self.channelSelList.setLayoutMode(QListView.Batched)
+        self.channelModel = ChannelListModel(parent = self.channelSelList)
+        self.channelFilter = ChannelFilterModel(self.channelSelList)
+        self.channelFilter.setSourceModel(self.channelModel)
+        self.channelSelList.setModel(self.channelFilter)
+
+        # Filter and bulk selection of the shown channels
+        self.channelFilterText = QLineEdit()
+        self.channelFilterText.setPlaceholderText("Filter")
+        self.checkAllBut = QPushButton("All")
+        self.checkNoneBut = QPushButton("None")
 
         #.rat Export checkbox
         self.chckConvertBitmap =QCheckBox("Convert textures to bitmaps")
@@ -220,6 +292,16 @@ class channelSelWindow(QDialog):
         self.chckConvertBitmap.setToolTip("Convert the textures to bitmaps. This allows to optimize the texture reading during rendering. Renderman uses .tex files, Karma uses .rat files, and Arnold uses .tx files.")
         self.chckConvertBitmap.setToolTipDuration(tooltipLong)
 
+        # USD Preview textures resolution
+        self.previewTierTitle = QLabel("USD Preview textures")
+        self.previewTier = QComboBox()
+        self.previewTier.addItem("Full resolution", None)
+        self.previewTier.addItem("Half resolution", "half")
+        self.previewTier.addItem("Quarter resolution", "quarter")
+        self.previewTier.setToolTip("Convert reduced resolution textures for the USD Preview material to lighten the viewport. Karma keeps the full resolution textures")
+        self.previewTier.setToolTipDuration(tooltipLong)
+        self.chckConvertBitmap.toggled.connect(self.previewTier.setEnabled)
+
         # OK and Cancel Buttons
         self.okBut = QPushButton("OK")
         self.cancelBut = QPushButton("Cancel")
@@ -229,9 +311,20 @@ class channelSelWindow(QDialog):
         self.mainLyt.setContentsMargins(5,5,5,5)
         self.mainLyt.setSpacing(5)
 
+        self.filterLyt = QHBoxLayout()
+        self.filterLyt.addWidget(self.channelFilterText)
+        self.filterLyt.addWidget(self.checkAllBut)
+        self.filterLyt.addWidget(self.checkNoneBut)
+        self.mainLyt.addLayout(self.filterLyt)
+
         self.mainLyt.addWidget(self.channelSelList)
         self.mainLyt.addWidget(self.chckConvertBitmap)
 
+        self.previewTierLyt = QHBoxLayout()
+        self.previewTierLyt.addWidget(self.previewTierTitle)
+        self.previewTierLyt.addWidget(self.previewTier)
+        self.mainLyt.addLayout(self.previewTierLyt)
+
         self.buttonsLyt = QHBoxLayout(self)
         self.buttonsLyt.addWidget(self.cancelBut)
         self.buttonsLyt.addWidget(self.okBut)
@@ -242,33 +335,44 @@ class channelSelWindow(QDialog):
         self.cancelBut.clicked.connect(self.close)
         self.okBut.clicked.connect(self.getSelectedChannels)
         self.okBut.clicked.connect(self.close)
-        
+        self.channelFilterText.textChanged.connect(self.channelFilter.setFilterFixedString)
+        self.checkAllBut.clicked.connect(lambda: self.channelFilter.setVisibleChecked(True))
+        self.checkNoneBut.clicked.connect(lambda: self.channelFilter.setVisibleChecked(False))
+
     def populateChannelList(self, foundChannels):
-        # Clear the channel list
-        self.channelModel.clear()
-        max_text_length = 0
-        for index, name in enumerate(foundChannels):
-            channel = QStandardItem(name)
-            channel.setFlags(Qt.ItemIsEnabled | Qt.ItemIsUserCheckable)
-            channel.setCheckState(Qt.Checked)
-            self.channelModel.appendRow(channel)
-
-            # Track the length of the longest text
-            max_text_length = max(max_text_length, len(name))
-        
-        # Dynamically set the width of the window
-        font_metrics = self.channelSelList.fontMetrics()
-        text_width = font_metrics.horizontalAdvance("W" * max_text_length)
-        text_height = font_metrics.height() * len(foundChannels) + 50
-        self.setMinimumSize(max(300, text_width +50), max(300, text_height))
+        # Replace the list with the scan results, channel names or any entry shown by its str()
+        self.maxTextWidth = 0
+        self.channelFilterText.clear()
+        self.channelModel.setEntries([])
+        self.addChannels(foundChannels)
+
+    def addChannel(self, name):
+        self.addChannels([name])
+
+    def addChannels(self, names):
+        # Append a batch of entries with a single model update
+        names = list(names)
+        if not names:
+            return
+        self.channelModel.appendEntries(names)
+
+        # Size the window on the widest text, the list scrolls past MAX_VISIBLE_ROWS
+        fontMetrics = self.channelSelList.fontMetrics()
+        self.maxTextWidth = max([self.maxTextWidth] + [fontMetrics.horizontalAdvance(str(name)) for name in names])
+        visibleRows = min(self.channelModel.rowCount(), MAX_VISIBLE_ROWS)
+        self.setMinimumSize(max(300, self.maxTextWidth + 80), max(300, fontMetrics.height() * visibleRows + 120))
+
+    def setScanning(self, scanning):
+        # Channels are added while the folders are scanned, wait for the end of the scan to build
+        self.okBut.setEnabled(not scanning)
+        if scanning:
+            self.setWindowTitle("Choose the textures channels (scanning...)")
+        else:
+            self.setWindowTitle("Choose the textures channels")
 
     def getSelectedChannels(self):
-        selectedChannels = []
-        channelModel = self.channelSelList.model()
-        for row in range(channelModel.rowCount()):
-            item = channelModel.item(row)
-            if item.checkState() == Qt.Checked:
-                selectedChannels.append(row)
+        # Rows of the checked channels, filtered out ones included
+        selectedChannels = self.channelModel.checkedRows()
 
         if self.chckConvertBitmap.isChecked():
             convertBitmap = True
@@ -276,6 +380,7 @@ class channelSelWindow(QDialog):
             convertBitmap = False
         textureSettings = { "selectedChannels": selectedChannels,
                             "convertBitmap": convertBitmap,
+                            "previewTier": self.previewTier.currentData() if convertBitmap else None,
                           }
             
         self.launch.emit(textureSettings)
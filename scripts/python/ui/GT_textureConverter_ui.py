@@ -1,11 +1,14 @@
 ####################### GT_textureConvert UI #######################
 # Imports
 from PySide2.QtCore import Qt, QSize, Signal
-from PySide2.QtGui import QStandardItemModel, QStandardItem, QIcon, QGuiApplication
+from PySide2.QtGui import QStandardItemModel, QStandardItem, QGuiApplication
 from PySide2.QtWidgets import (
-    QVBoxLayout, QListView, QPushButton, QDialog, QLineEdit, QLabel, QHBoxLayout, QProgressDialog, QFileDialog
+    QVBoxLayout, QListView, QPushButton, QDialog, QLineEdit, QLabel, QHBoxLayout, QProgressDialog, QFileDialog, QSpinBox, QCheckBox
 )
-from ui.ui_utils import getIconPath, loadSVGIcon
+from ui.ui_utils import getIcon, loadSVGIcon
+from utils.conversion import defaultWorkerCount
+from utils.scheduling import defaultMemoryBudget
+from utils.converters import availableEngines
 
 # Global variables
 TOOLTIPSHORT = 5000
@@ -15,6 +18,7 @@ TOOLTIPLONG = 8000
 class TextureConverterWindow(QDialog):
     #Signals
     start = Signal(dict)
+    stopWatching = Signal()
     def __init__(self, parent=None):
         self.parent = parent
         super(TextureConverterWindow, self).__init__(parent)
@@ -53,22 +57,71 @@ class TextureConverterWindow(QDialog):
         self.outputFolderPath.setText("${rootFolder}")
         self.outputFolderPath.setPlaceholderText("Output Texture folder")
 
+        # Subfolders
+        self.chckRecursive = QCheckBox("Include subfolders")
+        self.chckRecursive.setChecked(False)
+        self.chckRecursive.setToolTip("Convert the textures of the subfolders too. The folder tree is mirrored in the output folder")
+        self.chckRecursive.setToolTipDuration(TOOLTIPLONG)
+
+        self.depthSpin = QSpinBox()
+        self.depthSpin.setRange(0, 32)
+        self.depthSpin.setSpecialValueText("Unlimited")
+        self.depthSpin.setToolTip("Number of subfolder levels converted")
+        self.depthSpin.setToolTipDuration(TOOLTIPSHORT)
+
+        self.includeGlobs = QLineEdit()
+        self.includeGlobs.setPlaceholderText("Include (e.g. *.exr 4k/*)")
+        self.excludeGlobs = QLineEdit()
+        self.excludeGlobs.setPlaceholderText("Exclude (e.g. 8k *_preview*)")
+
         # Render Engine Selection List
         self.selRenderEngine = QListView()
         rendererModel = QStandardItemModel(self.selRenderEngine)
-        renderers = ["Karma"]
-        for index, name in enumerate(renderers):
+        # Render engines with a converter available in this session
+        renderers = availableEngines() or ["Karma"]
+        for name in renderers:
             renderer = QStandardItem(name)
             renderer.setFlags(Qt.ItemIsEnabled | Qt.ItemIsUserCheckable)
-            renderer.setCheckState(Qt.Checked)
+            renderer.setCheckState(Qt.Checked if name == "Karma" else Qt.Unchecked)
 
-            if index == 0:
-                renderer.setIcon(QIcon(getIconPath("karma.svg")))
+            if name == "Karma":
+                renderer.setIcon(getIcon("karma.svg"))
             rendererModel.appendRow(renderer)
 
 
         self.selRenderEngine.setModel(rendererModel)
 
+        # Reduced resolution variants
+        self.chckHalfProxy = QCheckBox("Half resolution variant")
+        self.chckHalfProxy.setToolTip("Also generate a half resolution texture named <texture>_half")
+        self.chckHalfProxy.setToolTipDuration(TOOLTIPSHORT)
+        self.chckQuarterProxy = QCheckBox("Quarter resolution variant")
+        self.chckQuarterProxy.setToolTip("Also generate a quarter resolution texture named <texture>_quarter")
+        self.chckQuarterProxy.setToolTipDuration(TOOLTIPSHORT)
+
+        # Watch folder
+        self.chckWatch = QCheckBox("Keep watching the input folder")
+        self.chckWatch.setToolTip("Convert the textures exported to the input folder in the background as soon as they are fully written, until stopped")
+        self.chckWatch.setToolTipDuration(TOOLTIPLONG)
+        self.watchedLabel = QLabel()
+        self.watchedLabel.setWordWrap(True)
+        self.stopWatchBut = QPushButton("Stop watching")
+        self.setWatchedFolders([])
+
+        # Worker count
+        self.workersCount = QSpinBox()
+        self.workersCount.setRange(1, max(64, defaultWorkerCount()))
+        self.workersCount.setValue(defaultWorkerCount())
+        self.workersCount.setToolTip("Number of textures converted at the same time. Defaults to the number of cores")
+        self.workersCount.setToolTipDuration(TOOLTIPSHORT)
+
+        # Memory budget of the simultaneous conversions, in GB
+        self.memoryBudget = QSpinBox()
+        self.memoryBudget.setRange(1, 4096)
+        self.memoryBudget.setSuffix(" GB")
+        self.memoryBudget.setValue(max(1, (defaultMemoryBudget() or 16 * 1024 ** 3) // 1024 ** 3))
+        self.memoryBudget.setToolTip("Memory the simultaneous conversions can use. Large textures run alone or with a few small ones")
+        self.memoryBudget.setToolTipDuration(TOOLTIPSHORT)
 
         # OK and Cancel Buttons
         self.okBut = QPushButton("OK")
@@ -94,9 +147,38 @@ class TextureConverterWindow(QDialog):
         self.mainLyt.addWidget(QLabel("Select output texture folder :"))
         self.mainLyt.addLayout(self.outputBrowseLyt)
 
+        self.recursiveLyt = QHBoxLayout()
+        self.recursiveLyt.addWidget(self.chckRecursive)
+        self.recursiveLyt.addWidget(QLabel("Max depth :"))
+        self.recursiveLyt.addWidget(self.depthSpin)
+        self.mainLyt.addLayout(self.recursiveLyt)
+
+        self.globsLyt = QHBoxLayout()
+        self.globsLyt.addWidget(self.includeGlobs)
+        self.globsLyt.addWidget(self.excludeGlobs)
+        self.mainLyt.addLayout(self.globsLyt)
+
         self.mainLyt.addWidget(QLabel("Select render engine for bitmap format :"))
         self.mainLyt.addWidget(self.selRenderEngine)
 
+        self.proxyLyt = QHBoxLayout()
+        self.proxyLyt.addWidget(self.chckHalfProxy)
+        self.proxyLyt.addWidget(self.chckQuarterProxy)
+        self.mainLyt.addLayout(self.proxyLyt)
+
+        self.mainLyt.addWidget(self.chckWatch)
+        self.watchLyt = QHBoxLayout()
+        self.watchLyt.addWidget(self.watchedLabel)
+        self.watchLyt.addWidget(self.stopWatchBut)
+        self.mainLyt.addLayout(self.watchLyt)
+
+        self.workersLyt = QHBoxLayout()
+        self.workersLyt.addWidget(QLabel("Simultaneous conversions :"))
+        self.workersLyt.addWidget(self.workersCount)
+        self.workersLyt.addWidget(QLabel("Memory budget :"))
+        self.workersLyt.addWidget(self.memoryBudget)
+        self.mainLyt.addLayout(self.workersLyt)
+
         self.buttonsLyt = QHBoxLayout()
         self.buttonsLyt.addWidget(self.cancelBut)
         self.buttonsLyt.addWidget(self.okBut)
@@ -108,6 +190,12 @@ class TextureConverterWindow(QDialog):
         self.outputBrowseButton.clicked.connect(self.showOutputFolder)
         self.okBut.clicked.connect(self.export)
         self.cancelBut.clicked.connect(self.close)
+        self.stopWatchBut.clicked.connect(self.stopWatching.emit)
+
+    def setWatchedFolders(self, folders):
+        self.watchedLabel.setText("Watching : " + ", ".join(folders) if folders else "")
+        self.watchedLabel.setVisible(bool(folders))
+        self.stopWatchBut.setVisible(bool(folders))
 
     def showBrowseFolder(self):
         self.inputPath = QFileDialog.getExistingDirectory()
@@ -132,10 +220,24 @@ class TextureConverterWindow(QDialog):
             if item.checkState() == Qt.Checked:
                 renderEngine.append(item.text())
         
+        proxyTiers = []
+        if self.chckHalfProxy.isChecked():
+            proxyTiers.append("half")
+        if self.chckQuarterProxy.isChecked():
+            proxyTiers.append("quarter")
+
         settings = {
             "inputDirectory": inputDirectory,
             "outputDirectory": outputDirectory,
-            "renderEngine": renderEngine
+            "renderEngine": renderEngine,
+            "workers": self.workersCount.value(),
+            "memoryBudget": self.memoryBudget.value() * 1024 ** 3,
+            "proxyTiers": proxyTiers,
+            "recursive": self.chckRecursive.isChecked(),
+            "depth": self.depthSpin.value() or None,
+            "include": self.includeGlobs.text(),
+            "exclude": self.excludeGlobs.text(),
+            "watch": self.chckWatch.isChecked()
         }
 
         self.start.emit(settings)
@@ -144,7 +246,17 @@ class progressConversionWindow(QProgressDialog):
     def __init__(self, label = "Converting textures...", maximum = 100, parent=None):
         super().__init__(label, "Cancel", 0, maximum, parent)
         self.setWindowTitle("Texture Conversion Progress")
-        self.setWindowModality(Qt.WindowModal)
+        # Conversions run in the background, keep Houdini usable
+        self.setWindowModality(Qt.NonModal)
         self.setMinimumDuration(0)
+        # Stay open at the end to show the conversion summary
+        self.setAutoClose(False)
+        self.setAutoReset(False)
         self.setValue(0)
-        self.setMinimumSize(450, 100)
\ No newline at end of file
+        self.setMinimumSize(450, 100)
+
+    def showSummary(self, summary, reportPath=None):
+        if reportPath:
+            summary += f"\nReport : {reportPath}"
+        self.setLabelText(summary)
+        self.setCancelButtonText("Close")
\ No newline at end of file
@@ -0,0 +1,98 @@
+####################### Channel List Model #######################
+# Checkable list of scan results (channels, texture groups, UDIM tiles...) for views of any size.
+# Rows are read from the entries list when the view asks for them, nothing is built per row,
+# so a QListView with uniform item sizes stays responsive with 100k entries.
+# Imports
+from PySide2.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+
+class ChannelListModel(QAbstractListModel):
+    # entries : scan results, label(entry) : their displayed text, toolTip(entry) : optional tooltip.
+    # Every entry is checked when added
+    def __init__(self, entries=None, label=str, toolTip=None, parent=None):
+        super().__init__(parent)
+        self.entries = list(entries or [])
+        self.label = label
+        self.toolTip = toolTip
+        self.unchecked = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self.label(self.entries[row])
+        if role == Qt.CheckStateRole:
+            return Qt.Unchecked if row in self.unchecked else Qt.Checked
+        if role == Qt.ToolTipRole and self.toolTip is not None:
+            return self.toolTip(self.entries[row])
+        if role == Qt.UserRole:
+            return self.entries[row]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsUserCheckable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        # The views send the check state as an int
+        self.setChecked([index.row()], value == Qt.Checked)
+        return True
+
+    def setEntries(self, entries):
+        self.beginResetModel()
+        self.entries = list(entries)
+        self.unchecked = set()
+        self.endResetModel()
+
+    def appendEntries(self, entries):
+        # One insertion for the whole batch
+        entries = list(entries)
+        if not entries:
+            return
+        first = len(self.entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self.entries.extend(entries)
+        self.endInsertRows()
+
+    def clear(self):
+        self.setEntries([])
+
+    def setChecked(self, rows, checked):
+        # Check or uncheck many rows with a single view update
+        rows = list(rows)
+        if not rows:
+            return
+        if checked:
+            self.unchecked.difference_update(rows)
+        else:
+            self.unchecked.update(rows)
+        self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)), [Qt.CheckStateRole])
+
+    def setAllChecked(self, checked):
+        self.setChecked(range(len(self.entries)), checked)
+
+    def checkedRows(self):
+        return [row for row in range(len(self.entries)) if row not in self.unchecked]
+
+    def checkedEntries(self):
+        return [self.entries[row] for row in self.checkedRows()]
+
+class ChannelFilterModel(QSortFilterProxyModel):
+    # Case insensitive text filter over a ChannelListModel
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+    def sourceRows(self):
+        # Rows of the source model shown by the filter
+        return [self.mapToSource(self.index(row, 0)).row() for row in range(self.rowCount())]
+
+    def setVisibleChecked(self, checked):
+        # Check or uncheck the rows shown by the filter only
+        self.sourceModel().setChecked(self.sourceRows(), checked)
@@ -1,15 +1,14 @@
 from PySide2.QtCore import Qt, QSize
 from PySide2.QtWidgets import QScrollArea, QToolButton, QGridLayout, QLabel, QSizePolicy, QWidget
-from PySide2.QtGui import QIcon
 import hou
-from ui.ui_utils import getIconPath
+from ui.ui_utils import getIcon
 
 class Section(QWidget):
     def __init__(self, title="", parent=None):
         super().__init__(parent)
 
-        self.downArrowIcon = QIcon(getIconPath("downArrow.svg"))
-        self.rightArrowIcon = QIcon(getIconPath("rightArrow.svg"))
+        self.downArrowIcon = getIcon("downArrow.svg")
+        self.rightArrowIcon = getIcon("rightArrow.svg")
 
         self.toggleButton = QToolButton(self)
         self.headerLine = hou.qt.Separator()
@@ -1,6 +1,13 @@
 import os
-from PySide2.QtGui import QIcon, QPixmap, QColor, QPainter
-from PySide2.QtSvg import QSvgRenderer 
+from PySide2.QtCore import QRectF
+from PySide2.QtGui import QIcon, QPixmap, QColor, QPainter, QGuiApplication
+from PySide2.QtSvg import QSvgRenderer
+
+# Icons shared by the tools windows, built once per session : (name, width, height, device pixel ratio) -> QIcon
+try:
+    icons
+except NameError:
+    icons = {}
 
 def getIconPath(icon_name):
     scriptDir = os.path.dirname(os.path.abspath(__file__))
@@ -8,12 +15,35 @@ def getIconPath(icon_name):
     iconPath = os.path.join(gtToolsDir, "config", "icons", icon_name)
     return iconPath
 
-def loadSVGIcon(svg_name, size):
-    iconPath = getIconPath(svg_name)
-    renderer = QSvgRenderer(iconPath)
-    pixmap = QPixmap(size)
+def devicePixelRatio():
+    app = QGuiApplication.instance()
+    screen = app.primaryScreen() if app else None
+    return screen.devicePixelRatio() if screen else 1.0
+
+def renderSVG(svg_name, size, ratio):
+    # Rasterize the SVG at the screen resolution, the pixmap keeps its logical size
+    renderer = QSvgRenderer(getIconPath(svg_name))
+    pixmap = QPixmap(round(size.width() * ratio), round(size.height() * ratio))
+    pixmap.setDevicePixelRatio(ratio)
     pixmap.fill(QColor(0, 0, 0, 0))
     painter = QPainter(pixmap)
-    renderer.render(painter)
+    renderer.render(painter, QRectF(0, 0, size.width(), size.height()))
     painter.end()
-    return QIcon(pixmap)
\ No newline at end of file
+    return pixmap
+
+def getIcon(icon_name, size=None):
+    # Shared QIcon of config/icons. With a size, the SVG is rasterized once at that size and the screen resolution,
+    # otherwise Qt renders it on demand and keeps the rendered sizes in the shared icon
+    ratio = devicePixelRatio()
+    key = (icon_name, size.width(), size.height(), ratio) if size is not None else (icon_name, None, None, None)
+    icon = icons.get(key)
+    if icon is None:
+        icon = icons[key] = QIcon(renderSVG(icon_name, size, ratio)) if size is not None else QIcon(getIconPath(icon_name))
+    return icon
+
+def loadSVGIcon(svg_name, size):
+    return getIcon(svg_name, size)
+
+def clearIcons():
+    # Forget the shared icons, after editing the SVG files
+    icons.clear()
@@ -0,0 +1,170 @@
+####################### Benchmarks #######################
+# Run from the scripts/python folder (python or hython) :
+#   python -m utils.benchmarks [scan] [file counts...]
+#   hython -m utils.benchmarks materials [material counts...]
+#   hython -m utils.benchmarks startup [launch count]
+# Imports
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from utils import scanner, scancache, loader
+
+# Global variables
+SCAN_SIZES = (1000, 10000, 100000)
+MATERIAL_COUNTS = (10, 100, 300)
+STARTUP_LAUNCHES = 10
+STARTUP_TOOLS = ("GT_textureConverter", "GT_materialBuilder")
+BENCH_CHANNELS = ["BaseColor", "Roughness", "Metalness", "Normal", "Height", "AO", "Opacity", "Emissive"]
+
+def timeIt(func, *args, repeat=3):
+    # Best wall time of a few runs, in seconds
+    best = None
+    result = None
+    for i in range(repeat):
+        startTime = time.perf_counter()
+        result = func(*args)
+        duration = time.perf_counter() - startTime
+        best = duration if best is None else min(best, duration)
+    return best, result
+
+def createTextureDirectory(fileCount, root=None):
+    # Synthetic texture library : assets x channels x UDIM tiles, plus converted .rat files
+    directory = tempfile.mkdtemp(prefix="gt_bench_", dir=root)
+    tilesPerChannel = 10
+    index = 0
+    asset = 0
+    while index < fileCount:
+        for channel in BENCH_CHANNELS:
+            for tile in range(tilesPerChannel):
+                extension = ".rat" if tile % 5 == 4 else ".exr"
+                fileName = f"Asset{asset:05d}_{channel}_ACEScg.{1001 + tile}{extension}"
+                open(os.path.join(directory, fileName), "w").close()
+                index += 1
+                if index >= fileCount:
+                    return directory
+        asset += 1
+    return directory
+
+def legacyScan(fileNames, channelNames, baseName):
+    # Nested channel/alias loop used by scanDirectory before the indexed scanner
+    import re
+    udimChannels = {}
+    for texture in fileNames:
+        for channel, names in channelNames.items():
+            if baseName in texture and any(name in texture for name in names) and ".rat" not in texture:
+                udim_match = re.search(r'\.\d{4}\.', texture)
+                if udim_match:
+                    udimChannels[channel] = texture.replace(udim_match.group(0), ".<UDIM>.")
+                else:
+                    udimChannels[channel] = texture
+    return udimChannels
+
+def walkMaterials(directory, aliasTable, scanCache=None):
+    return len(list(scanner.walkTextures(directory, aliasTable, scanCache = scanCache)))
+
+def benchmarkScan(sizes=SCAN_SIZES, root=None):
+    aliasTable = scanner.AliasTable(scanner.CHANNEL_NAMES)
+    results = []
+    for size in sizes:
+        directory = createTextureDirectory(size, root)
+        cacheDir = tempfile.mkdtemp(prefix="gt_bench_cache_", dir=root)
+        try:
+            listTime, fileNames = timeIt(os.listdir, directory)
+            legacyTime, legacy = timeIt(legacyScan, fileNames, scanner.CHANNEL_NAMES, "Asset")
+            indexedTime, indexed = timeIt(scanner.scanTextures, fileNames, aliasTable, "Asset")
+            # Walk and classify the folder, then reopen it from the scan cache (the folder is dated in the past,
+            # a folder modified during the last seconds is listed again)
+            pastTime = time.time() - 60
+            os.utime(directory, (pastTime, pastTime))
+            walkTime, walked = timeIt(walkMaterials, directory, aliasTable)
+            walkMaterials(directory, aliasTable, scancache.ScanCache(aliasTable, cacheDir))
+            cachedTime, cached = timeIt(lambda: walkMaterials(directory, aliasTable, scancache.ScanCache(aliasTable, cacheDir)))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+            shutil.rmtree(cacheDir, ignore_errors=True)
+        results.append({"files": size, "listdir": listTime, "legacy": legacyTime, "indexed": indexedTime, "walk": walkTime, "cached": cachedTime})
+        print(f"scan {size:>7} files | listdir {listTime * 1000:9.1f} ms | legacy {legacyTime * 1000:9.1f} ms"
+              f" | indexed {indexedTime * 1000:9.1f} ms | x{legacyTime / max(indexedTime, 1e-9):.1f}"
+              f" | walk {walkTime * 1000:9.1f} ms | scan cache {cachedTime * 1000:9.1f} ms")
+    return results
+
+def buildTimes(target, assets, channels, settings):
+    # Seconds per material of a buildMaterials call, the network is cleaned afterwards
+    from core import materialBuilder
+    startTime = time.perf_counter()
+    materials = materialBuilder.buildMaterials(target, assets, channels, settings)
+    duration = time.perf_counter() - startTime
+    for material in materials:
+        material.destroy()
+    return duration / max(len(materials), 1)
+
+def benchmarkMaterials(counts=MATERIAL_COUNTS, root=None):
+    # Node by node construction against template instancing (hython only)
+    import hou
+    from core import materialBuilder
+    results = []
+    for count in counts:
+        directory = createTextureDirectory(count * len(BENCH_CHANNELS) * 10, root)
+        matNet = hou.node("/mat").createNode("matnet", "gt_benchmark")
+        try:
+            assets = scanner.findMaterials(directory, scanner.AliasTable(scanner.CHANNEL_NAMES))
+            channels = materialBuilder.foundChannels(assets)
+            settings = {"materialList": [materialBuilder.KARMA], "convertBitmap": True, "textureFolder": directory}
+            nodeTime = buildTimes(matNet, assets, channels, dict(settings, useTemplates=False))
+            templateTime = buildTimes(matNet, assets, channels, dict(settings, useTemplates=True))
+        finally:
+            matNet.destroy()
+            shutil.rmtree(directory, ignore_errors=True)
+        results.append({"materials": len(assets), "nodes": nodeTime, "templates": templateTime})
+        print(f"build {len(assets):>5} materials | node by node {nodeTime * 1000:8.1f} ms/material"
+              f" | templates {templateTime * 1000:8.1f} ms/material | x{nodeTime / max(templateTime, 1e-9):.1f}")
+    return results
+
+def unloadTools():
+    # Forget the tools modules, the next load imports them again like in a new session
+    for name in list(sys.modules):
+        if name.startswith(("GT_", "ui", "core", "utils")) and name != "utils.benchmarks":
+            del sys.modules[name]
+
+def launchTime(name):
+    startTime = time.perf_counter()
+    loader.load(name)
+    return time.perf_counter() - startTime
+
+def benchmarkStartup(launches=STARTUP_LAUNCHES, tools=STARTUP_TOOLS):
+    # Module loading time of the shelf tools, first launch and following ones, cached and in dev mode (hython only)
+    devMode = os.environ.get(loader.DEV_ENV)
+    results = []
+    try:
+        for name in tools:
+            for dev in (False, True):
+                os.environ[loader.DEV_ENV] = "1" if dev else "0"
+                unloadTools()
+                firstTime = launchTime(name)
+                nextTimes = [launchTime(name) for i in range(launches - 1)]
+                nextTime = sum(nextTimes) / max(len(nextTimes), 1)
+                results.append({"tool": name, "dev": dev, "first": firstTime, "next": nextTime})
+                print(f"startup {name:<20} {'dev' if dev else 'cached':>6} | first launch {firstTime * 1000:8.1f} ms"
+                      f" | next launches {nextTime * 1000:8.2f} ms")
+    finally:
+        if devMode is None:
+            os.environ.pop(loader.DEV_ENV, None)
+        else:
+            os.environ[loader.DEV_ENV] = devMode
+    return results
+
+def main(args):
+    benchmark = args[0] if args and not args[0].isdigit() else "scan"
+    counts = tuple(int(arg) for arg in args if arg.isdigit())
+    if benchmark == "materials":
+        benchmarkMaterials(counts or MATERIAL_COUNTS)
+    elif benchmark == "startup":
+        benchmarkStartup(counts[0] if counts else STARTUP_LAUNCHES)
+    else:
+        benchmarkScan(counts or SCAN_SIZES)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,203 @@
+####################### Cache #######################
+# Imports
+import os
+import json
+import shutil
+import hashlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+CACHE_VERSION = 1
+INDEX_NAME = ".gt_conversion_cache.json"
+# Optional shared folder holding an index of every converted output, keyed by content
+SHARED_CACHE_ENV = "GTTOOLS_CONVERSION_CACHE"
+HASH_CHUNK = 1024 * 1024
+SAVE_INTERVAL = 2.0
+
+def settingsKey(converter, extension, options=None):
+    # Identify the converter settings an output was built with
+    data = json.dumps([converter, extension, options or {}], sort_keys=True)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
+
+def partialFile(path):
+    # Hidden file an output is written to before being renamed to its final name, keeping its extension for the converters
+    directory, fileName = os.path.split(path)
+    name, extension = os.path.splitext(fileName)
+    return os.path.join(directory, f".{name}.partial{extension}")
+
+def fileHash(path):
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def fileStat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def readIndex(path):
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("entries", {})
+
+def writeIndex(path, entries):
+    # Write then rename so a reader never sees a half written index
+    tmpPath = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmpPath, "w") as f:
+            json.dump({"version": CACHE_VERSION, "entries": entries}, f, indent=1, sort_keys=True)
+        os.replace(tmpPath, path)
+    except OSError as e:
+        logger.warning(f"Could not write conversion cache {path}: {e}")
+        if os.path.isfile(tmpPath):
+            os.remove(tmpPath)
+
+class ConversionCache:
+    # Remember which source content and settings every output was converted from.
+    # Each output folder has a small index next to the outputs; an optional shared index
+    # maps content keys to known outputs so a texture converted elsewhere is copied, not rebuilt.
+    def __init__(self, sharedDir=None):
+        self.sharedDir = sharedDir if sharedDir is not None else os.getenv(SHARED_CACHE_ENV, "")
+        self.indexes = {}
+        self.dirty = set()
+        self.hashes = {}
+        self.lock = threading.RLock()
+        self.lastSave = time.time()
+
+    def indexPath(self, directory):
+        return os.path.join(directory, INDEX_NAME)
+
+    def entries(self, directory):
+        with self.lock:
+            if directory not in self.indexes:
+                self.indexes[directory] = readIndex(self.indexPath(directory))
+            return self.indexes[directory]
+
+    def sourceHash(self, path, stat=None):
+        # Hash the source once per session and content state
+        stat = stat or fileStat(path)
+        if stat is None:
+            return None
+        key = (path, stat)
+        if key not in self.hashes:
+            self.hashes[key] = fileHash(path)
+        return self.hashes[key]
+
+    def isUpToDate(self, inputFile, outputFile, settings):
+        # True when outputFile was built from the current content of inputFile with these settings
+        sourceStat = fileStat(inputFile)
+        outputStat = fileStat(outputFile)
+        if sourceStat is None or outputStat is None:
+            return False
+
+        directory, outputName = os.path.split(outputFile)
+        entry = self.entries(directory).get(outputName)
+        if entry is None:
+            # Output converted before the cache existed, trust it if it is newer than its source
+            if outputStat[1] >= sourceStat[1]:
+                self.record(inputFile, outputFile, settings)
+                return True
+            return False
+
+        if entry.get("settings") != settings or [entry.get("outputSize"), entry.get("outputMtime")] != list(outputStat):
+            return False
+        if [entry.get("size"), entry.get("mtime")] == list(sourceStat):
+            return True
+
+        # The source was touched, only rebuild if its content really changed
+        if self.sourceHash(inputFile, sourceStat) != entry.get("hash"):
+            return False
+        with self.lock:
+            entry["size"], entry["mtime"] = sourceStat
+            self.dirty.add(directory)
+        return True
+
+    def record(self, inputFile, outputFile, settings):
+        # Store the state of a freshly converted output
+        sourceStat = fileStat(inputFile)
+        outputStat = fileStat(outputFile)
+        if sourceStat is None or outputStat is None:
+            return
+        sourceHash = self.sourceHash(inputFile, sourceStat)
+        directory, outputName = os.path.split(outputFile)
+        with self.lock:
+            self.entries(directory)[outputName] = {
+                "source": os.path.basename(inputFile),
+                "size": sourceStat[0],
+                "mtime": sourceStat[1],
+                "hash": sourceHash,
+                "settings": settings,
+                "outputSize": outputStat[0],
+                "outputMtime": outputStat[1],
+            }
+            self.dirty.add(directory)
+            if self.sharedDir:
+                shared = self.entries(self.sharedDir)
+                shared[f"{sourceHash}:{settings}"] = os.path.abspath(outputFile)
+                self.dirty.add(self.sharedDir)
+            if time.time() - self.lastSave > SAVE_INTERVAL:
+                self.flush()
+
+    def fetch(self, inputFile, outputFile, settings):
+        # Copy an output already converted from the same content and settings, True on success
+        if not self.sharedDir:
+            return False
+        sourceHash = self.sourceHash(inputFile)
+        knownOutput = self.entries(self.sharedDir).get(f"{sourceHash}:{settings}") if sourceHash else None
+        if not knownOutput or os.path.abspath(knownOutput) == os.path.abspath(outputFile):
+            return False
+        # Make sure the known output was not rebuilt or replaced since it was indexed
+        directory, outputName = os.path.split(knownOutput)
+        entry = self.entries(directory).get(outputName)
+        if entry is None or entry.get("hash") != sourceHash or entry.get("settings") != settings:
+            return False
+        if [entry.get("outputSize"), entry.get("outputMtime")] != list(fileStat(knownOutput) or []):
+            return False
+        tmpPath = partialFile(outputFile)
+        try:
+            shutil.copy2(knownOutput, tmpPath)
+            os.replace(tmpPath, outputFile)
+        except OSError:
+            if os.path.isfile(tmpPath):
+                os.remove(tmpPath)
+            return False
+        self.record(inputFile, outputFile, settings)
+        return True
+
+    def flush(self):
+        # Merge our entries with the indexes on disk, other sessions may have written meanwhile
+        with self.lock:
+            for directory in self.dirty:
+                path = self.indexPath(directory)
+                entries = readIndex(path)
+                entries.update(self.indexes.get(directory, {}))
+                self.indexes[directory] = entries
+                if os.path.isdir(directory):
+                    writeIndex(path, entries)
+            self.dirty = set()
+            self.lastSave = time.time()
+
+# Keep the loaded indexes when the module is reloaded
+try:
+    conversionCache
+except NameError:
+    conversionCache = None
+
+def getCache():
+    global conversionCache
+    if conversionCache is None:
+        conversionCache = ConversionCache()
+    return conversionCache
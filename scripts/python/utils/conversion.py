@@ -0,0 +1,680 @@
+####################### Conversion #######################
+# Imports
+import os
+import shutil
+import subprocess
+import threading
+import time
+import itertools
+import logging
+
+from utils import helpers, cache, manifest, probe, scanner, scheduling, instrumentation, watcher, converters
+from utils.cache import partialFile
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+FILTER = [".png", ".jpg", ".jpeg", ".tif", ".tiff", ".exr"]
+POLL_INTERVAL = 0.05
+# Reduced resolution variants : tier name -> resize percentage. The tier name is appended to the output name
+PROXY_TIERS = {"half": 50, "quarter": 25}
+
+# Job status
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELED = "canceled"
+
+def defaultWorkerCount():
+    return max(1, os.cpu_count() or 1)
+
+# Service events
+QUEUED = "queued"
+STARTED = "started"
+FINISHED = "finished"
+
+jobIds = itertools.count(1)
+
+def canonicalPath(path):
+    # Absolute path with the symbolic links resolved : a file reached through several paths has a single key
+    return os.path.normcase(os.path.realpath(path))
+
+def proxyFile(path, tier):
+    # Wood_BaseColor.1001.rat -> Wood_BaseColor.1001_half.rat
+    root, extension = os.path.splitext(path)
+    return f"{root}_{tier}{extension}"
+
+class ThreadProcess:
+    # Popen-like handle of an in-process conversion (see converters.ConverterBackend), run in a worker thread.
+    # kill() only asks the conversion to stop, it cannot interrupt a file being written : the conversion
+    # carries on in the background and onCanceled() removes what it wrote once it returns
+    def __init__(self, func, onCanceled=None):
+        self.returncode = None
+        self.canceled = threading.Event()
+        self.onCanceled = onCanceled
+        self.thread = threading.Thread(target=self.run, args=(func,), name="GT_conversion", daemon=True)
+        self.thread.start()
+
+    def run(self, func):
+        try:
+            self.returncode = 0 if func(self.canceled) else 1
+        except Exception as e:
+            logger.error(f"In-process conversion error: {e}")
+            self.returncode = 1
+        if self.canceled.is_set() and self.onCanceled:
+            self.onCanceled()
+
+    def poll(self):
+        return None if self.thread.is_alive() else self.returncode
+
+    def kill(self):
+        self.canceled.set()
+
+    def wait(self):
+        self.thread.join()
+        return self.returncode
+
+class ConversionJob:
+    def __init__(self, executable, inputFile, outputFile, cache=None, settings=None, steps=None, tempFiles=None, engine=None, tier=None):
+        self.id = next(jobIds)
+        self.executable = executable
+        self.inputFile = inputFile
+        self.outputFile = outputFile
+        # The last step writes partialFile, renamed to outputFile once the job succeeded.
+        # An interrupted conversion never leaves a half written output under the final name
+        self.partialFile = partialFile(outputFile)
+        # Commands run one after the other (resize then convert...), the converter alone by default
+        self.steps = steps or [[executable, inputFile, self.partialFile]]
+        self.step = 0
+        # Intermediate files removed once the job is over
+        self.tempFiles = tempFiles or []
+        # Conversion cache recording the finished output, and the converter settings key
+        self.cache = cache
+        self.settings = settings
+        # Render engine and proxy tier the job was built for, to rebuild it from the resume manifest
+        self.engine = engine
+        self.tier = tier
+        self.manifest = None
+        # Other targets of the same source and settings, copied from the output once it is converted (see ConversionPlan)
+        self.copies = []
+        self.status = PENDING
+        self.returnCode = None
+        self.process = None
+        self.cancelRequested = False
+        # Instrumentation : queue, start and exit times, source and output sizes (see utils.instrumentation)
+        self.queuedTime = time.time()
+        self.startTime = None
+        self.endTime = None
+        self.bytesIn = None
+        self.bytesOut = None
+        # Estimated memory and output size in bytes (see utils.scheduling)
+        self.memoryCost = None
+        self.diskCost = None
+
+    def command(self):
+        return self.steps[self.step]
+
+    def removeTempFiles(self):
+        for tempFile in self.tempFiles + [self.partialFile]:
+            if os.path.isfile(tempFile):
+                try:
+                    os.remove(tempFile)
+                except OSError:
+                    pass
+
+    def commitOutput(self):
+        # Move the finished output to its final name, False when the converter did not write it
+        try:
+            os.replace(self.partialFile, self.outputFile)
+        except OSError as e:
+            logger.error(f"Could not write {self.outputFile}: {e}")
+            return False
+        return True
+
+    def commitCopies(self):
+        # Copy the finished output to the other targets of the same source
+        for copyFile in self.copies:
+            tmpPath = partialFile(copyFile)
+            try:
+                shutil.copy2(self.outputFile, tmpPath)
+                os.replace(tmpPath, copyFile)
+            except OSError as e:
+                logger.error(f"Could not write {copyFile}: {e}")
+                if os.path.isfile(tmpPath):
+                    os.remove(tmpPath)
+                continue
+            if self.cache:
+                self.cache.record(self.inputFile, copyFile, self.settings)
+
+    def isActive(self):
+        return self.status in (PENDING, RUNNING)
+
+    def markStarted(self):
+        self.startTime = time.time()
+        self.bytesIn = instrumentation.fileSize(self.inputFile)
+
+    def markFinished(self):
+        self.endTime = time.time()
+        if self.status == DONE:
+            self.bytesOut = instrumentation.fileSize(self.outputFile)
+
+class ConversionPlan:
+    # Source -> target conversions requested during a run (every material, render setup and batch asset), each converted once.
+    # Targets are keyed by their canonical path, so an output requested twice, or through a symbolic link or a relative path,
+    # is a single job. Targets of the same source and converter settings in other folders (a texture linked into several
+    # asset folders) are not converted again, they are copied from the first output
+    def __init__(self):
+        # canonical target -> job, (canonical source, settings key) -> job, job id -> keys of the job
+        self.targets = {}
+        self.sources = {}
+        self.keys = {}
+        self.order = []
+
+    def job(self, outputFile):
+        # Job planned for this output, if any
+        return self.targets.get(canonicalPath(outputFile))
+
+    def add(self, job):
+        # Plan the job and return the one converting its output : the job itself, or the job planned before it
+        target = canonicalPath(job.outputFile)
+        planned = self.targets.get(target)
+        if planned is None:
+            source = (canonicalPath(job.inputFile), job.settings)
+            planned = self.sources.get(source)
+            if planned is None:
+                planned = self.sources[source] = job
+                self.keys[job.id] = (source, [])
+                self.order.append(job)
+            else:
+                planned.copies.append(job.outputFile)
+            self.targets[target] = planned
+            self.keys[planned.id][1].append(target)
+        for copyFile in list(job.copies):
+            copyTarget = canonicalPath(copyFile)
+            if copyTarget in self.targets:
+                continue
+            if planned is not job:
+                planned.copies.append(copyFile)
+            self.targets[copyTarget] = planned
+            self.keys[planned.id][1].append(copyTarget)
+        return planned
+
+    def discard(self, job):
+        # Forget a finished job, its targets can be planned again
+        keys = self.keys.pop(job.id, None)
+        if keys is None:
+            return
+        source, targets = keys
+        self.sources.pop(source, None)
+        for target in targets:
+            self.targets.pop(target, None)
+        if job in self.order:
+            self.order.remove(job)
+
+    def jobs(self):
+        return list(self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+def flushCaches(jobs):
+    for jobCache in {job.cache for job in jobs if job.cache}:
+        jobCache.flush()
+    for jobManifest in {job.manifest for job in jobs if job.manifest}:
+        jobManifest.flush()
+
+def updateManifest(job):
+    if job.manifest:
+        job.manifest.update(job)
+
+class ConversionPool:
+    # Bounded pool of converter processes. Jobs are started up to maxWorkers at a time
+    # and reaped by polling, so the caller keeps control between two polls (progress, cancel...)
+    # The largest textures start first, and the jobs running together stay under memoryBudget (bytes)
+    def __init__(self, maxWorkers=None, memoryBudget=None):
+        self.maxWorkers = maxWorkers if maxWorkers and maxWorkers > 0 else defaultWorkerCount()
+        self.memoryBudget = memoryBudget if memoryBudget else scheduling.defaultMemoryBudget()
+        self.running = []
+        self.canceled = False
+
+    def cost(self, job):
+        scale = PROXY_TIERS.get(job.tier, 100) / 100.0
+        return scheduling.jobCost(job, scale)
+
+    def schedule(self, jobs):
+        # Largest jobs first, so the end of the batch is not a single 8K texture converting while the other cores are idle
+        return sorted(jobs, key=lambda job: self.cost(job)[0], reverse=True)
+
+    def reservedSpace(self, job, jobs):
+        # Output size of the jobs writing to the same volume as job
+        jobVolume = scheduling.volume(job.outputFile)
+        return sum(self.cost(other)[1] for other in jobs if scheduling.volume(other.outputFile) == jobVolume)
+
+    def hasDiskSpace(self, job, jobs):
+        free = scheduling.freeSpace(os.path.dirname(job.outputFile))
+        if free is None:
+            return True
+        return free - self.reservedSpace(job, jobs) >= self.cost(job)[1] + scheduling.DISK_RESERVE
+
+    def admitJobs(self, pending):
+        # Remove from pending (in schedule order) and return the jobs to start now : within the worker count,
+        # the memory budget and the free space of their output volume. Smaller jobs fill the budget left by the large ones.
+        # A job over the budget runs alone : nothing else starts until the pool drained, or a stream of smaller jobs
+        # (watch folder) would keep it waiting forever
+        admitted = []
+        for job in list(pending):
+            active = self.running + admitted
+            if len(active) >= self.maxWorkers:
+                break
+            memory = self.cost(job)[0]
+            if active and self.memoryBudget and memory > self.memoryBudget:
+                break
+            if active:
+                if self.memoryBudget and sum(self.cost(other)[0] for other in active) + memory > self.memoryBudget:
+                    continue
+                if not self.hasDiskSpace(job, active):
+                    continue
+            pending.remove(job)
+            admitted.append(job)
+        return admitted
+
+    def launch(self, job):
+        creationFlags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        command = job.command()
+        try:
+            if callable(command):
+                job.process = ThreadProcess(command, onCanceled = job.removeTempFiles)
+            else:
+                job.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=creationFlags)
+        except OSError as e:
+            logger.error(f"Could not start conversion of {job.inputFile}: {e}")
+            job.status = FAILED
+            job.removeTempFiles()
+            return False
+        return True
+
+    def startJob(self, job):
+        job.step = 0
+        job.markStarted()
+        # Leftovers of an interrupted run
+        job.removeTempFiles()
+        if not self.hasDiskSpace(job, self.running):
+            logger.error(f"Not enough disk space to convert {job.inputFile} to {job.outputFile}")
+            job.status = FAILED
+            job.markFinished()
+            updateManifest(job)
+            return False
+        if not self.launch(job):
+            job.markFinished()
+            return False
+        job.status = RUNNING
+        self.running.append(job)
+        return True
+
+    def finishJob(self, job):
+        # Record the output of a finished job in the conversion cache and copy it to the other targets of its source
+        if job.status != DONE:
+            return
+        if job.cache:
+            job.cache.record(job.inputFile, job.outputFile, job.settings)
+        job.commitCopies()
+
+    def reapJobs(self, finish=True):
+        # Collect the jobs that exited since the last poll, starting the next step of multi-step jobs.
+        # finish : also record and copy their outputs (see finishJob), the caller does it otherwise
+        finished = []
+        for job in list(self.running):
+            returnCode = job.process.poll()
+            if returnCode is None:
+                continue
+            if returnCode == 0 and not job.cancelRequested and job.step + 1 < len(job.steps):
+                job.step += 1
+                if self.launch(job):
+                    continue
+                returnCode = -1
+            job.returnCode = returnCode
+            job.status = DONE if returnCode == 0 and not job.cancelRequested else FAILED
+            if job.status == DONE and not job.commitOutput():
+                job.status = FAILED
+            self.running.remove(job)
+            job.markFinished()
+            job.removeTempFiles()
+            if finish:
+                self.finishJob(job)
+            updateManifest(job)
+            finished.append(job)
+        return finished
+
+    def killRunning(self):
+        # Kill the converters still running and remove their partial outputs. In-process conversions are not
+        # waited for, they remove their output themselves when they return (see ThreadProcess)
+        for job in self.running:
+            if job.process.poll() is None:
+                job.process.kill()
+            if not isinstance(job.process, ThreadProcess):
+                job.process.wait()
+            job.status = CANCELED
+            job.markFinished()
+            job.removeTempFiles()
+            updateManifest(job)
+        self.running = []
+
+    def cancel(self):
+        self.canceled = True
+
+    def run(self, jobs, onJobFinished=None, isCanceled=None, onPoll=None):
+        # Run all the jobs, calling onJobFinished(job) as soon as each one exits
+        pending = self.schedule(jobs)
+        for job in pending:
+            job.queuedTime = time.time()
+        self.canceled = False
+        while pending or self.running:
+            if self.canceled or (isCanceled and isCanceled()):
+                self.killRunning()
+                for job in pending:
+                    job.status = CANCELED
+                    updateManifest(job)
+                break
+
+            for job in self.admitJobs(pending):
+                if not self.startJob(job) and onJobFinished:
+                    onJobFinished(job)
+
+            for job in self.reapJobs():
+                if job.status == FAILED:
+                    logger.warning(f"Conversion failed ({job.returnCode}): {job.inputFile}")
+                if onJobFinished:
+                    onJobFinished(job)
+
+            if onPoll:
+                onPoll()
+            if self.running:
+                time.sleep(POLL_INTERVAL)
+        flushCaches(jobs)
+        return jobs
+
+class ConversionService:
+    # Background conversion queue shared by the tools. Jobs are submitted from any thread and
+    # converted by a worker thread using a ConversionPool. Listeners are called with (event, job)
+    # from the worker thread, so UI code has to forward them through queued Qt signals.
+    def __init__(self, maxWorkers=None, memoryBudget=None):
+        self.pool = ConversionPool(maxWorkers, memoryBudget)
+        self.queue = []
+        self.jobs = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.thread = None
+        self.finishedJobs = []
+        # Targets of the active jobs
+        self.plan = ConversionPlan()
+
+    def setMaxWorkers(self, maxWorkers):
+        self.pool.maxWorkers = maxWorkers if maxWorkers and maxWorkers > 0 else defaultWorkerCount()
+
+    def setMemoryBudget(self, memoryBudget):
+        self.pool.memoryBudget = memoryBudget if memoryBudget else scheduling.defaultMemoryBudget()
+
+    def addListener(self, listener):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def removeListener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def notify(self, event, job):
+        for listener in list(self.listeners):
+            try:
+                listener(event, job)
+            except Exception as e:
+                logger.error(f"Conversion listener error: {e}")
+
+    def activeJob(self, outputFile):
+        # Job currently pending or running for this output, if any
+        job = self.plan.job(outputFile)
+        return job if job is not None and job.isActive() else None
+
+    def submit(self, jobs):
+        # Queue the jobs and return the ones to track. An output already being converted, or another target
+        # of a source being converted with the same settings, is not queued twice : the active job is returned instead
+        submitted = {}
+        queued = []
+        with self.lock:
+            for job in jobs:
+                planned = self.plan.add(job)
+                if planned is not job:
+                    submitted[planned.id] = planned
+                    continue
+                job.status = PENDING
+                job.queuedTime = time.time()
+                self.jobs[job.id] = job
+                submitted[job.id] = job
+                queued.append(job)
+            self.queue = self.pool.schedule(self.queue + queued)
+            if queued and (self.thread is None or not self.thread.is_alive()):
+                self.thread = threading.Thread(target=self.loop, name="GT_conversionService", daemon=True)
+                self.thread.start()
+        for job in queued:
+            self.notify(QUEUED, job)
+        return list(submitted.values())
+
+    def status(self, jobId):
+        job = self.jobs.get(jobId)
+        return job.status if job else None
+
+    def pendingJobs(self):
+        return [job for job in self.jobs.values() if job.isActive()]
+
+    def cancel(self, jobs=None):
+        # Cancel the given jobs, or every active job when jobs is None
+        canceled = []
+        with self.lock:
+            targets = list(self.jobs.values()) if jobs is None else jobs
+            for job in targets:
+                if job.status == PENDING:
+                    job.status = CANCELED
+                    updateManifest(job)
+                    self.plan.discard(job)
+                    canceled.append(job)
+                elif job.status == RUNNING:
+                    job.cancelRequested = True
+                    job.process.kill()
+        for job in canceled:
+            self.notify(FINISHED, job)
+
+    def loop(self):
+        while True:
+            started = []
+            with self.lock:
+                finished = []
+                self.queue = [job for job in self.queue if job.status == PENDING]
+                for job in self.pool.admitJobs(self.queue):
+                    if self.pool.startJob(job):
+                        started.append(job)
+                    else:
+                        finished.append(job)
+                # Outputs are hashed and copied below, without holding the lock
+                finished += self.pool.reapJobs(finish = False)
+                for job in finished:
+                    # The partial output of a killed job is already removed
+                    if job.cancelRequested:
+                        job.status = CANCELED
+                        updateManifest(job)
+
+            for job in started:
+                self.notify(STARTED, job)
+            for job in finished:
+                self.pool.finishJob(job)
+
+            flushed = []
+            with self.lock:
+                # Until now, the copy targets of the finished jobs stayed planned
+                for job in finished:
+                    self.plan.discard(job)
+                self.finishedJobs += finished
+                idle = not self.queue and not self.pool.running
+                if idle:
+                    # Forget the finished jobs and let the thread exit, submit() starts a new one
+                    flushed = self.finishedJobs
+                    self.finishedJobs = []
+                    self.jobs = {jobId: job for jobId, job in self.jobs.items() if job.isActive()}
+                    self.thread = None
+
+            for job in finished:
+                self.notify(FINISHED, job)
+            if idle:
+                flushCaches(flushed)
+                return
+            time.sleep(POLL_INTERVAL)
+
+# Keep the running service alive when the module is reloaded
+try:
+    service
+except NameError:
+    service = None
+
+def getService(maxWorkers=None, memoryBudget=None):
+    global service
+    if service is None:
+        service = ConversionService(maxWorkers, memoryBudget)
+    else:
+        if maxWorkers:
+            service.setMaxWorkers(maxWorkers)
+        if memoryBudget:
+            service.setMemoryBudget(memoryBudget)
+    return service
+
+def converterFor(engine):
+    # Converter of the render engine format (iconvert for Karma, OpenImageIO for Arnold...)
+    backend = converters.backendFor(engine)
+    if backend is None:
+        raise Exception(f"No texture converter found for {engine}. Please check your Houdini installation.")
+    return backend
+
+def makeJob(backend, engine, inputFile, outputFile, conversionCache, tier=None, resizer=None):
+    # Conversion of inputFile, or of its proxy tier : resized to a temporary EXR, then converted like the full resolution texture
+    if tier is None:
+        key = cache.settingsKey(backend.name, backend.extension)
+        steps = [backend.command(inputFile, partialFile(outputFile))]
+        return ConversionJob(backend.name, inputFile, outputFile, cache = conversionCache, settings = key, steps = steps, engine = engine)
+    key = cache.settingsKey(backend.name, backend.extension, {"tier": tier})
+    tempFile = os.path.join(os.path.dirname(outputFile), "." + os.path.basename(os.path.splitext(outputFile)[0]) + ".tmp.exr")
+    steps = [resizer + [inputFile, "--resize", f"{PROXY_TIERS[tier]}%", "-o", tempFile], backend.command(tempFile, partialFile(outputFile))]
+    return ConversionJob(backend.name, inputFile, outputFile, cache = conversionCache, settings = key, steps = steps, tempFiles = [tempFile], engine = engine, tier = tier)
+
+def resumeConversions(batchManifest, conversionCache):
+    # Jobs of an interrupted batch still to run, rebuilt from its manifest
+    jobs = []
+    resizer = None
+    for outputFile, entry in sorted(batchManifest.remaining().items()):
+        if not os.path.isfile(entry["input"]):
+            continue
+        tier = entry.get("tier")
+        if tier is not None and resizer is None:
+            resizer = helpers.getBinary("hoiiotool")
+        job = makeJob(converterFor(entry["engine"]), entry["engine"], entry["input"], outputFile, conversionCache, tier, resizer)
+        job.copies = list(entry.get("copies", []))
+        jobs.append(job)
+    for job in jobs:
+        job.manifest = batchManifest
+    return jobs
+
+def collectConversions(settings, textureGroups = [], plan = None):
+    # Build the conversion jobs for an input directory, or for the texture groups found by the scanner.
+    # plan : ConversionPlan shared by the calls of a run, the targets it already holds are not converted again.
+    # Only the new jobs are returned
+    # The jobs of a folder batch are recorded in a resume manifest (see utils.manifest) : when the same batch
+    # was interrupted, its unfinished jobs are queued again as they were, then the folder is walked for the new and
+    # changed textures (settings["resume"], on by default)
+    inputDirectory = settings.get("inputDirectory", "")
+    outputDirectory = settings.get("outputDirectory", "")
+    renderEngine = settings.get("renderEngine", [])
+
+    conversionCache = cache.getCache()
+    plan = plan if plan is not None else ConversionPlan()
+    jobs = []
+
+    batchManifest = None
+    if inputDirectory and not textureGroups and settings.get("files") is None:
+        batchManifest = manifest.getManifest(settings)
+    if batchManifest is not None and settings.get("resume", True) and batchManifest.load():
+        jobs = [job for job in resumeConversions(batchManifest, conversionCache) if plan.add(job) is job]
+        if jobs:
+            logger.info(f"Resuming {len(jobs)} conversions of {inputDirectory}")
+
+    def addJob(inputFile, outputFile, tier=None):
+        # Skip the outputs already planned, built from the current source content, or copied from the shared cache
+        if plan.job(outputFile) is not None:
+            return
+        key = cache.settingsKey(backend.name, backend.extension, {"tier": tier} if tier else None)
+        if conversionCache.isUpToDate(inputFile, outputFile, key):
+            return
+        if conversionCache.fetch(inputFile, outputFile, key):
+            return
+        job = makeJob(backend, engine, inputFile, outputFile, conversionCache, tier, resizer)
+        if plan.add(job) is job:
+            jobs.append(job)
+
+    def addJobs(inputFile, outputFile):
+        # Files that are not images of their format would only make the converter fail. A valid file
+        # the probe cannot parse (unknown header layout) is still converted
+        if probeTextures and probe.isSupported(inputFile) and probe.probe(inputFile) is None:
+            if not probe.hasSignature(inputFile):
+                logger.warning(f"Skipping {inputFile}: not a valid image file")
+                return
+            logger.debug(f"Could not read the header of {inputFile}, converting it anyway")
+        addJob(inputFile, outputFile)
+        for tier in proxyTiers:
+            addJob(inputFile, proxyFile(outputFile, tier), tier)
+
+    proxyTiers = [tier for tier in settings.get("proxyTiers", []) if tier in PROXY_TIERS]
+    probeTextures = settings.get("probeTextures", True)
+    resizer = helpers.getBinary("hoiiotool") if proxyTiers else None
+
+    for engine in renderEngine:
+        backend = converterFor(engine)
+        extension = backend.extension
+        # Handle the texture groups found by the scanner (GT Material Builder), UDIM tiles included
+        if textureGroups != []:
+            for group in textureGroups:
+                for inputFile in group.files():
+                    if any(inputFile.endswith(ext) for ext in FILTER):
+                        outputFile = os.path.splitext(inputFile)[0] + extension
+                        addJobs(inputFile, outputFile)
+        else:
+            # Input folder, and its subfolders in recursive mode. settings["files"] limits the conversion to some of its files
+            if settings.get("files") is not None:
+                inputFiles = ((os.path.dirname(path), os.path.basename(path), path) for path in settings["files"])
+            else:
+                depth = settings.get("depth", None) if settings.get("recursive", False) else 0
+                inputFiles = ((directory, entry.name, entry.path) for directory, entry, texture in
+                              scanner.walkTextures(inputDirectory, depth = depth, include = settings.get("include"), exclude = settings.get("exclude")))
+            for directory, fileName, inputFile in inputFiles:
+                if not any(fileName.endswith(ext) for ext in FILTER):
+                    continue
+                if outputDirectory == "${rootFolder}":
+                    outputFile = os.path.splitext(inputFile)[0] + extension
+                else:
+                    # Mirror the input subfolders in the output folder
+                    outputFolder = os.path.join(outputDirectory, os.path.relpath(directory, inputDirectory))
+                    if not os.path.isdir(outputFolder):
+                        os.makedirs(outputFolder)
+                    outputFile = os.path.normpath(os.path.join(outputFolder, os.path.splitext(fileName)[0] + extension))
+                addJobs(inputFile, outputFile)
+    conversionCache.flush()
+    if batchManifest is not None and jobs:
+        batchManifest.add(jobs)
+    return jobs
+
+def watchFolder(settings, workers=None, onSubmitted=None):
+    # Convert the textures landing in settings["inputDirectory"] as soon as they are fully written.
+    # The conversions go to the background service, onSubmitted(jobs) is called from the watcher thread
+    def convert(files):
+        jobs = collectConversions(dict(settings, files = files))
+        if jobs:
+            jobs = getService(workers, settings.get("memoryBudget")).submit(jobs)
+            logger.info(f"Watch folder {settings.get('inputDirectory')}: {len(jobs)} conversions queued")
+            if onSubmitted:
+                onSubmitted(jobs)
+    return watcher.watch(settings, convert, extensions = FILTER)
@@ -0,0 +1,123 @@
+####################### Converter Backends #######################
+# The tools converting textures to the render engines formats. Each backend declares the render engines
+# it serves, the extension it writes and whether it runs in-process, and builds the job steps :
+# an argv list run as a subprocess, or a callable(canceled) run in a worker thread, without any process startup.
+# Imports
+import abc
+import logging
+
+from utils import helpers
+
+try:
+    import OpenImageIO as oiio
+except ImportError:
+    oiio = None
+
+logger = logging.getLogger(__name__)
+
+class ConverterBackend(abc.ABC):
+    # name identifies the converter in the conversion cache, keep it stable
+    name = ""
+    engines = []
+    extension = ""
+    inProcess = False
+
+    def available(self):
+        return True
+
+    @abc.abstractmethod
+    def command(self, inputFile, outputFile):
+        # argv list, or callable(canceled) returning True on success for in-process backends
+        pass
+
+    def capabilities(self):
+        return {"name": self.name, "engines": list(self.engines), "extension": self.extension, "inProcess": self.inProcess}
+
+class BinaryBackend(ConverterBackend):
+    # Converter shipped with Houdini, or found on the PATH (see helpers.findBinary)
+    binary = ""
+
+    def executable(self):
+        return helpers.findBinary(self.binary) or ""
+
+    def available(self):
+        return bool(self.executable())
+
+    def command(self, inputFile, outputFile):
+        # <binary> <input> <output> by default
+        return [self.executable(), inputFile, outputFile]
+
+class IconvertBackend(BinaryBackend):
+    # Houdini .rat textures
+    name = "iconvert"
+    binary = "iconvert"
+    engines = ["Karma"]
+    extension = ".rat"
+
+class OiioBackend(ConverterBackend):
+    # Tiled, mipmapped .tx textures made in-process by OpenImageIO (maketx)
+    name = "oiio"
+    engines = ["Arnold"]
+    extension = ".tx"
+    inProcess = True
+
+    def available(self):
+        return oiio is not None
+
+    def command(self, inputFile, outputFile):
+        def convert(canceled):
+            if canceled.is_set():
+                return False
+            config = oiio.ImageSpec()
+            config.attribute("maketx:highlightcomp", 1)
+            config.attribute("maketx:filtername", "lanczos3")
+            if not oiio.ImageBufAlgo.make_texture(oiio.MakeTxTexture, inputFile, outputFile, config):
+                logger.error(f"OpenImageIO could not convert {inputFile}: {oiio.geterror()}")
+                return False
+            return True
+        return convert
+
+class HoiiotoolBackend(BinaryBackend):
+    # The same .tx textures through Houdini's oiiotool, when OpenImageIO cannot be imported
+    name = "hoiiotool"
+    binary = "hoiiotool"
+    engines = ["Arnold"]
+    extension = ".tx"
+
+    def command(self, inputFile, outputFile):
+        return [self.executable(), inputFile, "-otex", outputFile]
+
+class TxmakeBackend(BinaryBackend):
+    # RenderMan .tex textures
+    name = "txmake"
+    binary = "txmake"
+    engines = ["RenderMan"]
+    extension = ".tex"
+
+    def command(self, inputFile, outputFile):
+        return [self.executable(), inputFile, outputFile]
+
+# Backends by order of preference, the in-process OpenImageIO converter before the hoiiotool one
+BACKENDS = [IconvertBackend(), OiioBackend(), HoiiotoolBackend(), TxmakeBackend()]
+
+def register(backend, first=False):
+    # Add a studio backend, first=True prefers it over the default ones
+    if first:
+        BACKENDS.insert(0, backend)
+    else:
+        BACKENDS.append(backend)
+
+def backendFor(engine):
+    # First available backend serving the render engine, None when there is none
+    for backend in BACKENDS:
+        if any(name in engine for name in backend.engines) and backend.available():
+            return backend
+    return None
+
+def availableEngines():
+    engines = []
+    for backend in BACKENDS:
+        for engine in backend.engines:
+            if engine not in engines and backend.available():
+                engines.append(engine)
+    return engines
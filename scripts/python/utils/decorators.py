@@ -7,6 +7,8 @@ import logging
 from datetime import datetime
 from functools import wraps
 
+from utils import instrumentation
+
 logger = logging.getLogger(__name__)
 
 def err_handler(func, name="", plugin=False, silent=False):
@@ -15,6 +17,8 @@ def err_handler(func, name="", plugin=False, silent=False):
         try:
             return func(*args, **kwargs)
         except Exception as e:
+            # Recorded even when silent, only the logging is skipped
+            instrumentation.recordError(name, func.__name__, e)
             if not silent:
                 exc_type, exc_obj, exc_tb = sys.exc_info()
 
@@ -35,10 +39,12 @@ def timer(name):
         def func_wrapper(*args, **kwargs):
             startTime = datetime.now()
             logger.info("starttime: %s" % startTime.strftime("%Y-%m-%d %H:%M:%S"))
-            func(*args, **kwargs)
+            with instrumentation.Stopwatch(name):
+                result = func(*args, **kwargs)
             endTime = datetime.now()
             logger.info("endtime: %s" % endTime.strftime("%Y-%m-%d %H:%M:%S"))
             logger.info("duration: %s" % (endTime - startTime))
+            return result
 
         return func_wrapper
     
@@ -1,46 +1,65 @@
-import os, platform, os.path
-import hou
+import os, platform, os.path, shutil
 
-def getBinary(binary):
-    # Locate Houdini root path
-    root = None
-    binaryFolder = None
-    executable = None
-    slash = None
-
-    # Determine OS filepaths
-    if platform.system() == "Linux":
-
-        root = ""
-        houdiniPaths = hou.houdiniPath()
-        #Check for Houdini bin folder (this is to make the search adaptable to each inviduals' Houdini installation)
-        for path in houdiniPaths:
-            if "bin" in path:
-                root = path
-                break
-        
-        slash = "/"
-        binaryFolder = slash + "bin" + slash
-        executable = binary + " "
-
-        #Linux Houdini root path is /opt/hfs{version}/houdini
-        root = root.rpartition(slash)[0]
-
-    # Filepaths for Windows
-    elif platform.system() == "Windows":
-
-        root = ""
-        houdiniPaths = hou.houdiniPath()
-        #Check for Houdini bin folder (this is to make the search adaptable to each inviduals' Houdini installation)
-        for path in houdiniPaths:
-            if "bin" in path:
-                root = path
+try:
+    import hou
+except ImportError:
+    hou = None
+
+# Global variables
+HFS_ENV = "HFS"
+
+# Keep the resolved binaries when the module is reloaded : binary -> full path, None when it was not found
+try:
+    resolvedBinaries
+except NameError:
+    resolvedBinaries = {}
+
+def executableName(binary):
+    return binary + ".exe" if platform.system() == "Windows" else binary
+
+def isExecutable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+def binaryFolders():
+    # Houdini bin folders, by order of preference : $HFS/bin, then the Houdini install found on the Houdini path
+    folders = []
+    root = os.getenv(HFS_ENV, "")
+    if not root and hou is not None:
+        root = hou.getenv(HFS_ENV, "") or ""
+    if root:
+        folders.append(os.path.join(root, "bin"))
+
+    if hou is not None:
+        # Linux Houdini root path is /opt/hfs{version}/houdini, the binaries are in /opt/hfs{version}/bin
+        for path in hou.houdiniPath():
+            path = os.path.normpath(path)
+            for folder in (os.path.join(os.path.dirname(path), "bin"), os.path.join(path, "bin"), path):
+                if os.path.basename(folder) == "bin" and folder not in folders:
+                    folders.append(folder)
+    return folders
+
+def findBinary(binary):
+    # Full path of a Houdini binary (iconvert, hoiiotool...), or of the one on the PATH. None when it was not found.
+    # Resolved once per session, clearBinaries() forgets the resolved paths
+    if binary not in resolvedBinaries:
+        name = executableName(binary)
+        path = None
+        for folder in binaryFolders():
+            candidate = os.path.join(folder, name)
+            if isExecutable(candidate):
+                path = candidate
                 break
+        if path is None:
+            path = shutil.which(binary)
+        resolvedBinaries[binary] = path
+    return resolvedBinaries[binary]
 
-        root.replace("/", "\\")
-        slash = "\\"
-        binaryFolder = slash
-        executable = binary + ".exe"
+def getBinary(binary):
+    # argv of a Houdini binary, to be extended with its arguments and run without a shell
+    path = findBinary(binary)
+    if path is None:
+        raise FileNotFoundError(f"Could not find {binary}. Please set the {HFS_ENV} environment variable to your Houdini installation.")
+    return [path]
 
-    binaryString = root + binaryFolder + executable + " "
-    return binaryString
\ No newline at end of file
+def clearBinaries():
+    resolvedBinaries.clear()
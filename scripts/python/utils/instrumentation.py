@@ -0,0 +1,154 @@
+####################### Instrumentation #######################
+# Timings of the tools (conversion, material building) and per-file conversion reports.
+# Conversion reports are written as JSON to GTTOOLS_REPORT_DIR, or to the temp folder
+# Imports
+import os
+import json
+import time
+import tempfile
+import threading
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+REPORT_DIR_ENV = "GTTOOLS_REPORT_DIR"
+MB = 1024 * 1024
+
+####################### Timings #######################
+# name -> list of durations in seconds, filled by the timer decorator and the tools
+lock = threading.Lock()
+try:
+    timings
+except NameError:
+    timings = {}
+    errors = []
+
+def record(name, duration):
+    with lock:
+        timings.setdefault(name, []).append(duration)
+
+def recordError(name, funcName, error):
+    with lock:
+        errors.append({"name": name, "function": funcName, "error": str(error), "time": datetime.now().isoformat(timespec="seconds")})
+
+def timingSummary():
+    # {name: {count, total, mean, max}} of the recorded timings
+    with lock:
+        return {name: {"count": len(durations), "total": sum(durations), "mean": sum(durations) / len(durations), "max": max(durations)}
+                for name, durations in timings.items() if durations}
+
+def reset():
+    with lock:
+        timings.clear()
+        del errors[:]
+
+class Stopwatch:
+    # with Stopwatch("material") : ... records the duration of the block
+    def __init__(self, name):
+        self.name = name
+        self.duration = None
+
+    def __enter__(self):
+        self.startTime = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.duration = time.perf_counter() - self.startTime
+        record(self.name, self.duration)
+        return False
+
+####################### Conversion Report #######################
+def fileSize(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+def jobEntry(job):
+    # Timings of one conversion job : queue wait, wall time, bytes in/out and converter exit status
+    started = job.startTime is not None
+    ended = job.endTime is not None
+    return {
+        "input": job.inputFile,
+        "output": job.outputFile,
+        "status": job.status,
+        "returnCode": job.returnCode,
+        "queueWait": (job.startTime - job.queuedTime) if started else None,
+        "wallTime": (job.endTime - job.startTime) if started and ended else None,
+        "bytesIn": job.bytesIn,
+        "bytesOut": job.bytesOut,
+    }
+
+class ConversionReport:
+    # Per-file timings and throughput of a set of conversion jobs
+    def __init__(self, jobs, name="conversion"):
+        self.name = name
+        self.jobs = list(jobs)
+
+    def entries(self):
+        return [jobEntry(job) for job in self.jobs]
+
+    def totals(self):
+        entries = self.entries()
+        starts = [job.startTime for job in self.jobs if job.startTime is not None]
+        ends = [job.endTime for job in self.jobs if job.endTime is not None]
+        # Wall time of the whole batch, from the first start to the last exit
+        duration = (max(ends) - min(starts)) if starts and ends else 0.0
+        done = [entry for entry in entries if entry["status"] == "done"]
+        bytesIn = sum(entry["bytesIn"] or 0 for entry in done)
+        bytesOut = sum(entry["bytesOut"] or 0 for entry in done)
+        wallTimes = [entry["wallTime"] for entry in done if entry["wallTime"] is not None]
+        queueWaits = [entry["queueWait"] for entry in entries if entry["queueWait"] is not None]
+        statuses = {}
+        for entry in entries:
+            statuses[entry["status"]] = statuses.get(entry["status"], 0) + 1
+        return {
+            "files": len(entries),
+            "statuses": statuses,
+            "duration": duration,
+            "bytesIn": bytesIn,
+            "bytesOut": bytesOut,
+            "mbPerSecond": bytesIn / MB / duration if duration > 0 else 0.0,
+            "filesPerSecond": len(done) / duration if duration > 0 else 0.0,
+            "meanWallTime": sum(wallTimes) / len(wallTimes) if wallTimes else 0.0,
+            "maxWallTime": max(wallTimes) if wallTimes else 0.0,
+            "meanQueueWait": sum(queueWaits) / len(queueWaits) if queueWaits else 0.0,
+        }
+
+    def slowest(self, count=5):
+        entries = [entry for entry in self.entries() if entry["wallTime"] is not None]
+        return sorted(entries, key=lambda entry: entry["wallTime"], reverse=True)[:count]
+
+    def summary(self):
+        # Short text for the progress window
+        totals = self.totals()
+        statuses = ", ".join(f"{count} {status}" for status, count in sorted(totals["statuses"].items()))
+        return (f"{totals['files']} files ({statuses}) in {totals['duration']:.1f} s\n"
+                f"{totals['mbPerSecond']:.1f} MB/s, {totals['filesPerSecond']:.2f} files/s, "
+                f"{totals['meanWallTime']:.2f} s per file, {totals['meanQueueWait']:.2f} s queued")
+
+    def toDict(self):
+        return {
+            "name": self.name,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "totals": self.totals(),
+            "slowest": self.slowest(),
+            "jobs": self.entries(),
+            "timings": timingSummary(),
+            "errors": list(errors),
+        }
+
+    def write(self, path=None):
+        # Write the report as JSON, returns its path or None when it could not be written
+        if path is None:
+            reportDir = os.getenv(REPORT_DIR_ENV, "") or tempfile.gettempdir()
+            path = os.path.join(reportDir, f"gt_{self.name}_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        try:
+            with open(path, "w") as f:
+                json.dump(self.toDict(), f, indent=1)
+        except OSError as e:
+            logger.warning(f"Could not write conversion report {path}: {e}")
+            return None
+        return path
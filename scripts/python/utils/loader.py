@@ -0,0 +1,45 @@
+####################### Module Loading #######################
+# The shelf tools import their modules once per session, the next launches reuse them.
+# Set GTTOOLS_DEV=1 to reload the tools modules on every launch while working on them.
+# Modules only needed by some code paths (UI of another tool...) are imported lazily :
+# lazyImport returns the module right away and runs it on its first attribute access
+# Imports
+import os
+import sys
+import importlib
+import importlib.util
+
+# Global variables
+DEV_ENV = "GTTOOLS_DEV"
+
+def devMode():
+    return os.getenv(DEV_ENV, "") not in ("", "0")
+
+def reloadModules(*modules):
+    # Reload the modules in order (dependencies first), in dev mode only
+    if not devMode():
+        return
+    for module in modules:
+        importlib.reload(module)
+
+def lazyImport(name):
+    # Module imported on its first use
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+def load(name):
+    # Shelf tools entry point : the tool module, imported once, reloaded with its dependencies in dev mode
+    loaded = name in sys.modules
+    module = importlib.import_module(name)
+    if loaded:
+        reloadModules(module)
+    return module
@@ -0,0 +1,126 @@
+####################### Resume Manifest #######################
+# The conversion batches of a folder record their jobs in a small manifest next to the outputs.
+# When a batch is interrupted (canceled, Houdini crash...), the next run of the same batch rebuilds
+# the jobs that did not finish from the manifest, before walking the folder for the new and changed textures.
+# Failed jobs are not resumed, the walk queues them again while their output is missing or outdated.
+# The manifest is removed once every job of the batch is over.
+# Imports
+import os
+import json
+import hashlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+MANIFEST_VERSION = 1
+MANIFEST_NAME = ".gt_conversion_manifest.json"
+SAVE_INTERVAL = 2.0
+
+# Job status, same values as the conversion module ones
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELED = "canceled"
+
+# Settings changing the list of jobs of a batch
+BATCH_KEYS = ["inputDirectory", "outputDirectory", "renderEngine", "proxyTiers", "recursive", "depth", "include", "exclude"]
+
+def batchKey(settings):
+    data = json.dumps([settings.get(key) for key in BATCH_KEYS], sort_keys=True)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
+
+def batchDirectory(settings):
+    # Folder holding the manifest : the output folder, or the input folder when the outputs go next to the sources
+    outputDirectory = settings.get("outputDirectory", "")
+    if not outputDirectory or outputDirectory == "${rootFolder}":
+        return settings.get("inputDirectory", "")
+    return outputDirectory
+
+class ConversionManifest:
+    # outputFile -> {input, engine, tier, copies, status} of the jobs of one batch
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.lastSave = time.time()
+
+    def load(self):
+        # False when there is no manifest of this batch to resume
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != MANIFEST_VERSION or data.get("batch") != self.key:
+            return False
+        self.entries = data.get("jobs", {})
+        return True
+
+    def add(self, jobs):
+        with self.lock:
+            for job in jobs:
+                job.manifest = self
+                self.entries[job.outputFile] = {"input": job.inputFile, "engine": job.engine, "tier": job.tier, "copies": job.copies,
+                                                "status": PENDING}
+            self.dirty = True
+        self.flush()
+
+    def update(self, job):
+        with self.lock:
+            entry = self.entries.get(job.outputFile)
+            if entry is None:
+                return
+            # A canceled job is resumed like a pending one
+            entry["status"] = PENDING if job.status == CANCELED else job.status
+            self.dirty = True
+            save = time.time() - self.lastSave > SAVE_INTERVAL
+        if save:
+            self.flush()
+
+    def remaining(self):
+        # Entries of the jobs that did not finish, interrupted or never started
+        return {outputFile: entry for outputFile, entry in self.entries.items() if entry.get("status") in (PENDING, RUNNING)}
+
+    def isFinished(self, outputFile):
+        entry = self.entries.get(outputFile)
+        return entry is not None and entry.get("status") == DONE
+
+    def flush(self):
+        # Write then rename, the manifest is removed once the batch is complete
+        with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            self.lastSave = time.time()
+            if not self.remaining():
+                self.remove()
+                return
+            tmpPath = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmpPath, "w") as f:
+                    json.dump({"version": MANIFEST_VERSION, "batch": self.key, "jobs": self.entries}, f, indent=1, sort_keys=True)
+                os.replace(tmpPath, self.path)
+            except OSError as e:
+                logger.warning(f"Could not write conversion manifest {self.path}: {e}")
+                if os.path.isfile(tmpPath):
+                    os.remove(tmpPath)
+
+    def remove(self):
+        if os.path.isfile(self.path):
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+def getManifest(settings):
+    # Manifest of the folder batch described by the converter settings, None when there is no batch folder
+    directory = batchDirectory(settings)
+    if not directory or not os.path.isdir(directory):
+        return None
+    return ConversionManifest(os.path.join(directory, MANIFEST_NAME), batchKey(settings))
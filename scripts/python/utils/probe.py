@@ -0,0 +1,292 @@
+####################### Texture Probe #######################
+# Read the size, channel count, bit depth and embedded colorspace of PNG, JPEG, TIFF and OpenEXR files
+# from their headers only, without decoding any pixel. Results are cached per file and content state.
+# Imports
+import os
+import struct
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+# Bytes first read from an EXR header, doubled while the header is incomplete, up to HEADER_LIMIT
+HEADER_START = 4 * 1024
+HEADER_LIMIT = 16 * 1024 * 1024
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+EXR_MAGIC = b"\x76\x2f\x31\x01"
+# PNG color type -> channel count
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+# EXR pixel type -> (bit depth, sample format)
+EXR_PIXEL_TYPES = {0: (32, "uint"), 1: (16, "float"), 2: (32, "float")}
+TIFF_SAMPLE_FORMATS = {1: "uint", 2: "int", 3: "float"}
+# TIFF field type -> value size
+TIFF_FIELD_SIZES = {1: 1, 3: 2, 4: 4, 16: 8}
+# First bytes of the files, per extension
+MAGIC = {".png": [PNG_SIGNATURE], ".jpg": [b"\xff\xd8"], ".jpeg": [b"\xff\xd8"], ".exr": [EXR_MAGIC],
+         ".tif": [b"II*\0", b"MM\0*", b"II+\0", b"MM\0+"], ".tiff": [b"II*\0", b"MM\0*", b"II+\0", b"MM\0+"]}
+# Red primary x of the EXR chromaticities -> colorspace
+EXR_PRIMARIES = {0.713: "ACEScg", 0.7347: "ACES2065-1", 0.64: "Linear"}
+# Image channel count -> MaterialX image signature
+SIGNATURES = {1: "float", 2: "float", 3: "color3", 4: "color4"}
+
+class ImageInfo:
+    __slots__ = ("format", "width", "height", "channels", "bitDepth", "sampleFormat", "colorspace", "tiled")
+
+    def __init__(self, format, width, height, channels, bitDepth, sampleFormat="uint", colorspace=None, tiled=False):
+        self.format = format
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.bitDepth = bitDepth
+        self.sampleFormat = sampleFormat
+        self.colorspace = colorspace
+        self.tiled = tiled
+
+    def __repr__(self):
+        return (f"ImageInfo({self.format}, {self.width}x{self.height}, channels={self.channels}, "
+                f"{self.bitDepth} bit {self.sampleFormat}, colorspace={self.colorspace!r})")
+
+    def layout(self):
+        # What has to match between the UDIM tiles of a texture
+        return self.channels, self.bitDepth, self.sampleFormat
+
+    def signature(self):
+        return SIGNATURES.get(self.channels)
+
+    def decodedSize(self):
+        return self.width * self.height * self.channels * max(self.bitDepth // 8, 1)
+
+####################### Formats #######################
+def probePng(f):
+    if f.read(8) != PNG_SIGNATURE:
+        return None
+    info = None
+    # Chunks before the image data : IHDR first, then the colorspace chunks
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, chunkType = struct.unpack(">I4s", header)
+        if chunkType == b"IHDR":
+            width, height, bitDepth, colorType = struct.unpack(">IIBB", f.read(10))
+            info = ImageInfo("png", width, height, PNG_CHANNELS.get(colorType, 3), bitDepth)
+            f.seek(length - 10 + 4, os.SEEK_CUR)
+            continue
+        if info is None or chunkType in (b"IDAT", b"IEND"):
+            break
+        if chunkType == b"sRGB":
+            info.colorspace = "sRGB"
+        elif chunkType == b"iCCP":
+            # Profile name, then the compressed profile
+            name = f.read(min(length, 80)).split(b"\0", 1)[0].decode("latin-1")
+            info.colorspace = "sRGB" if "srgb" in name.lower() else name
+            f.seek(length - min(length, 80) + 4, os.SEEK_CUR)
+            continue
+        elif chunkType == b"gAMA" and info.colorspace is None:
+            gamma = struct.unpack(">I", f.read(4))[0]
+            info.colorspace = "Linear" if gamma == 100000 else "sRGB"
+            f.seek(length - 4 + 4, os.SEEK_CUR)
+            continue
+        f.seek(length + 4, os.SEEK_CUR)
+    return info
+
+def probeJpeg(f):
+    if f.read(2) != b"\xff\xd8":
+        return None
+    colorspace = "sRGB"
+    # Only the segment headers are read, the segments themselves are skipped
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if code in (0xD9, 0xDA):
+            # End of image or start of the scan data before any frame header
+            return None
+        length = struct.unpack(">H", f.read(2))[0]
+        # Frame headers, except the Huffman (C4), arithmetic coding (CC) and reserved (C8) markers
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            precision, height, width, components = struct.unpack(">BHHB", f.read(6))
+            return ImageInfo("jpeg", width, height, components, precision, colorspace = colorspace)
+        if code == 0xE2:
+            data = f.read(length - 2)
+            # ICC profile : the description is not at a fixed offset, look for the usual names
+            if data.startswith(b"ICC_PROFILE\0") and b"sRGB" not in data and b"Display P3" in data:
+                colorspace = "Display P3"
+            continue
+        f.seek(length - 2, os.SEEK_CUR)
+
+def probeTiff(f):
+    byteOrder = f.read(2)
+    if byteOrder not in (b"II", b"MM"):
+        return None
+    endian = "<" if byteOrder == b"II" else ">"
+    magic = struct.unpack(endian + "H", f.read(2))[0]
+    # Classic TIFF : 32 bit offsets and 12 byte fields. BigTIFF : 64 bit offsets and 20 byte fields
+    if magic == 42:
+        offset = struct.unpack(endian + "I", f.read(4))[0]
+        countFormat, fieldFormat, offsetFormat, inlineSize = "H", "HHI4s", "I", 4
+    elif magic == 43:
+        offsetSize, reserved, offset = struct.unpack(endian + "HHQ", f.read(12))
+        if offsetSize != 8:
+            return None
+        countFormat, fieldFormat, offsetFormat, inlineSize = "Q", "HHQ8s", "Q", 8
+    else:
+        return None
+    f.seek(offset)
+    count = struct.unpack(endian + countFormat, f.read(struct.calcsize(endian + countFormat)))[0]
+    fieldLength = struct.calcsize(endian + fieldFormat)
+    fields = {}
+    for index in range(count):
+        tag, fieldType, valueCount, value = struct.unpack(endian + fieldFormat, f.read(fieldLength))
+        size = TIFF_FIELD_SIZES.get(fieldType)
+        if size is None:
+            continue
+        # First value of the field, stored in place when it fits
+        if size * valueCount > inlineSize:
+            position = f.tell()
+            f.seek(struct.unpack(endian + offsetFormat, value)[0])
+            value = f.read(size)
+            f.seek(position)
+        fields[tag] = struct.unpack(endian + {1: "B", 2: "H", 4: "I", 8: "Q"}[size], value[:size])[0]
+    if 256 not in fields or 257 not in fields:
+        return None
+    return ImageInfo("tiff", fields[256], fields[257], fields.get(277, 1), fields.get(258, 1),
+                     TIFF_SAMPLE_FORMATS.get(fields.get(339, 1), "uint"), tiled = 322 in fields)
+
+def readString(data, position):
+    end = data.index(b"\0", position)
+    return data[position:end].decode("latin-1"), end + 1
+
+def probeExr(f):
+    data = f.read(HEADER_START)
+    if data[:4] != EXR_MAGIC:
+        return None
+    # A few KB hold the usual headers, the ones with many channels or much metadata are read further until their end
+    while True:
+        info = exrHeader(data)
+        if info is not None or len(data) >= HEADER_LIMIT:
+            return info
+        chunk = f.read(min(len(data), HEADER_LIMIT - len(data)))
+        if not chunk:
+            return None
+        data += chunk
+
+def exrHeader(data):
+    # ImageInfo of the EXR header, None when it is incomplete
+    flags = struct.unpack("<I", data[4:8])[0]
+    position = 8
+    channels = []
+    dataWindow = None
+    colorspace = None
+    try:
+        # Attributes of the first part : name, type, size, value, until an empty name
+        while data[position:position + 1] != b"\0":
+            name, position = readString(data, position)
+            attributeType, position = readString(data, position)
+            size = struct.unpack("<i", data[position:position + 4])[0]
+            position += 4
+            value = data[position:position + size]
+            position += size
+            if name == "channels":
+                offset = 0
+                while value[offset:offset + 1] != b"\0":
+                    channelName, offset = readString(value, offset)
+                    channels.append((channelName, struct.unpack("<i", value[offset:offset + 4])[0]))
+                    offset += 16
+            elif name == "dataWindow":
+                dataWindow = struct.unpack("<iiii", value[:16])
+            elif name == "chromaticities" and colorspace is None:
+                redX = struct.unpack("<f", value[:4])[0]
+                for primary, primaryColorspace in EXR_PRIMARIES.items():
+                    if abs(redX - primary) < 0.005:
+                        colorspace = primaryColorspace
+            elif attributeType == "string" and name.lower() in ("oiio:colorspace", "colorspace", "colorinteropid"):
+                colorspace = value.decode("latin-1")
+    except (ValueError, struct.error):
+        return None
+    if dataWindow is None or not channels:
+        return None
+    bitDepth, sampleFormat = EXR_PIXEL_TYPES.get(max(pixelType for name, pixelType in channels), (16, "float"))
+    # Tiled single part file, or tiled parts
+    tiled = bool(flags & 0x200)
+    return ImageInfo("exr", dataWindow[2] - dataWindow[0] + 1, dataWindow[3] - dataWindow[1] + 1, len(channels), bitDepth, sampleFormat,
+                     colorspace, tiled)
+
+PROBES = {".png": probePng, ".jpg": probeJpeg, ".jpeg": probeJpeg, ".tif": probeTiff, ".tiff": probeTiff, ".exr": probeExr}
+
+####################### Cache #######################
+# path -> ((size, mtime), ImageInfo or None)
+lock = threading.Lock()
+try:
+    probed
+except NameError:
+    probed = {}
+
+def fileState(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def probe(path):
+    # ImageInfo of the file, None when its header could not be parsed. That does not make the file invalid :
+    # the header may use a layout the probe does not know, see hasSignature for files that are not images at all
+    probeFunc = PROBES.get(os.path.splitext(path)[1].lower())
+    state = fileState(path)
+    if probeFunc is None or state is None:
+        return None
+    with lock:
+        cached = probed.get(path)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    try:
+        with open(path, "rb") as f:
+            info = probeFunc(f)
+    except (OSError, struct.error, ValueError) as e:
+        logger.debug(f"Could not read the header of {path}: {e}")
+        info = None
+    with lock:
+        probed[path] = (state, info)
+    return info
+
+def isSupported(path):
+    return os.path.splitext(path)[1].lower() in PROBES
+
+def hasSignature(path):
+    # False when the file does not start like an image of its extension (truncated, corrupt, misnamed...)
+    signatures = MAGIC.get(os.path.splitext(path)[1].lower())
+    if signatures is None:
+        return True
+    try:
+        with open(path, "rb") as f:
+            start = f.read(8)
+    except OSError:
+        return False
+    return any(start.startswith(signature) for signature in signatures)
+
+def tileMismatches(paths):
+    # [(path, reason)] of the UDIM tiles whose channels or bit depth differ from the first tile
+    reference = None
+    mismatches = []
+    for path in paths:
+        info = probe(path)
+        if info is None:
+            if not hasSignature(path):
+                mismatches.append((path, "not a valid image file"))
+            continue
+        if reference is None:
+            reference = info
+        elif info.layout() != reference.layout():
+            mismatches.append((path, f"{info.channels} channels {info.bitDepth} bit {info.sampleFormat}, "
+                                     f"first tile {reference.channels} channels {reference.bitDepth} bit {reference.sampleFormat}"))
+    return mismatches
+
+def clear():
+    with lock:
+        probed.clear()
@@ -0,0 +1,171 @@
+####################### Scan Cache #######################
+# Listings of the texture folders, with their textures already classified (channel, UDIM, colorspace...),
+# kept in memory and on disk so opening the Material Builder again on a large network folder does not
+# list and parse it again. Each folder is cached on its own, keyed by its absolute path, and is only
+# reused while its modification time is the same : adding, removing or renaming a file lists it again.
+# The cache folder is GTTOOLS_SCAN_CACHE, or gt_scan_cache in the temp folder
+# Imports
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import logging
+
+from utils import scanner
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+CACHE_VERSION = 2
+SCAN_CACHE_ENV = "GTTOOLS_SCAN_CACHE"
+# A folder modified this close to its listing may have changed within the file system time resolution, it is not trusted
+RACY_DELAY = 2.0
+
+def aliasKey(aliasTable):
+    # The classification depends on the channel names and the converted texture extensions
+    data = json.dumps([aliasTable.channelNames, sorted(aliasTable.ignoredExtensions)], sort_keys=True)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
+
+def textureData(texture):
+    return None if texture is None else [getattr(texture, field) for field in scanner.TextureFile.__slots__]
+
+class FileStat:
+    __slots__ = ("st_size",)
+
+    def __init__(self, size):
+        self.st_size = size
+
+class FileEntry:
+    # os.DirEntry-like file of a cached listing
+    __slots__ = ("name", "path", "size")
+
+    def __init__(self, directory, name, size):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        self.size = size
+
+    def is_dir(self, follow_symlinks=True):
+        return False
+
+    def is_file(self):
+        return True
+
+    def stat(self):
+        return FileStat(self.size)
+
+class DirectoryListing:
+    # Sub folders and files of a folder : [name], [(FileEntry, TextureFile or None)]
+    def __init__(self, directory, mtime, scanned, folders, files):
+        self.directory = directory
+        self.mtime = mtime
+        self.scanned = scanned
+        self.folders = folders
+        self.files = files
+
+    def toDict(self, key):
+        return {"version": CACHE_VERSION, "aliases": key, "directory": self.directory, "mtime": self.mtime, "scanned": self.scanned,
+                "folders": self.folders, "files": [[entry.name, entry.size, textureData(texture)] for entry, texture in self.files]}
+
+    @staticmethod
+    def fromDict(data):
+        files = [(FileEntry(data["directory"], name, size), scanner.TextureFile(*texture) if texture else None)
+                 for name, size, texture in data["files"]]
+        return DirectoryListing(data["directory"], data["mtime"], data["scanned"], data["folders"], files)
+
+class ScanCache:
+    def __init__(self, aliasTable, cacheDir=None):
+        self.aliasTable = aliasTable
+        self.key = aliasKey(aliasTable)
+        self.cacheDir = cacheDir or os.getenv(SCAN_CACHE_ENV, "") or os.path.join(tempfile.gettempdir(), "gt_scan_cache")
+        self.listings = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cachePath(self, directory):
+        name = hashlib.blake2b(f"{self.key}:{directory}".encode("utf-8"), digest_size=12).hexdigest()
+        return os.path.join(self.cacheDir, name + ".json")
+
+    def isValid(self, listing, mtime):
+        return listing is not None and listing.mtime == mtime and listing.scanned - mtime / 1e9 > RACY_DELAY
+
+    def read(self, directory):
+        try:
+            with open(self.cachePath(directory), "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != CACHE_VERSION or data.get("aliases") != self.key or data.get("directory") != directory:
+            return None
+        try:
+            return DirectoryListing.fromDict(data)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def write(self, listing):
+        # Write then rename, several sessions may share the cache folder
+        path = self.cachePath(listing.directory)
+        tmpPath = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cacheDir, exist_ok=True)
+            with open(tmpPath, "w") as f:
+                json.dump(listing.toDict(self.key), f)
+            os.replace(tmpPath, path)
+        except OSError as e:
+            logger.warning(f"Could not write scan cache {path}: {e}")
+            if os.path.isfile(tmpPath):
+                os.remove(tmpPath)
+
+    def scan(self, directory, mtime):
+        # List and classify the folder
+        folders = []
+        files = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(entry.name)
+                elif entry.is_file():
+                    files.append((FileEntry(directory, entry.name, entry.stat().st_size), self.aliasTable.parse(entry.name)))
+        return DirectoryListing(directory, mtime, time.time(), folders, files)
+
+    def listing(self, directory):
+        # DirectoryListing of the folder, from the memory or disk cache when the folder did not change. Raises OSError
+        directory = os.path.abspath(directory)
+        mtime = os.stat(directory).st_mtime_ns
+        with self.lock:
+            listing = self.listings.get(directory)
+        if not self.isValid(listing, mtime):
+            listing = self.read(directory)
+            if self.isValid(listing, mtime):
+                self.hits += 1
+            else:
+                self.misses += 1
+                listing = self.scan(directory, mtime)
+                self.write(listing)
+            with self.lock:
+                self.listings[directory] = listing
+        else:
+            self.hits += 1
+        return listing
+
+    def invalidate(self, directory=None):
+        # Forget a folder, or every folder when directory is None
+        with self.lock:
+            if directory is None:
+                self.listings = {}
+            else:
+                self.listings.pop(os.path.abspath(directory), None)
+
+# Keep the loaded listings when the module is reloaded
+try:
+    scanCaches
+except NameError:
+    scanCaches = {}
+
+def getScanCache(aliasTable):
+    key = aliasKey(aliasTable)
+    if key not in scanCaches:
+        scanCaches[key] = ScanCache(aliasTable)
+    return scanCaches[key]
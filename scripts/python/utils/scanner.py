@@ -0,0 +1,359 @@
+####################### Texture Scanner #######################
+# Imports
+import os
+import re
+import copy
+import fnmatch
+from collections import deque
+
+from utils import converters
+
+# Global variables
+# Dictionary to map channels to their possible names
+CHANNEL_NAMES = {
+    'BaseColor': ['BaseColor', 'Diffuse', 'Albedo', 'Color', 'DIFF', 'BC', 'basecolor', 'diffuse', 'albedo', 'color', 'diff', 'bc'],
+    'AO': ['AmbientOcclusion', 'AO', 'ambiantOcclusion', 'ao'],
+    'Specular': ['Specular', 'SPC', 'specular', 'spc'],
+    'SpecularColor': ['SpecularColor', 'SpecColor', 'SPCC', 'specularColor', 'specColor', 'spcc'],
+    'SpecularRoughness': ['Roughness', 'Rough', 'SPCR', 'roughness', 'rough', 'spcr'],
+    'Metallic': ['Metalness', 'Metallic', 'MTC', 'metalness', 'metallic', 'mtc'],
+    'Normal': ['Normal', 'NRM', 'normal', 'nrm'],
+    'Bump': ['Bump', 'BMP', 'bump', 'bmp'],
+    'Displacement': ['Displacement', 'DISP', 'displacement', 'disp'],
+    'Opacity': ['Opacity', 'Alpha', 'OPA', 'opacity', 'alpha', 'opa'],
+    'Subsurface': ['Subsurface', 'SSS', 'subsurface', 'sss'],
+    'SubsurfaceColor': ['SubsurfaceColor', 'SSC', 'subsurfaceColor', 'ssc'],
+    'SubsurfaceRadius': ['SubsurfaceRadius', 'SSR', 'subsurfaceRadius', 'ssr'],
+    'Emissive': ['Emissive', 'Emission', 'EMIS', 'emissive', 'emission', 'emis'],
+    'EmissiveColor': ['EmissiveColor', 'EmissionColor', 'EMIC', 'emissiveColor', 'emissionColor', 'emic'],
+    'Glossiness': ['Glossiness', 'GLS', 'glossiness', 'gls'],
+    'Height': ['Height', 'HGT', 'height', 'hgt'],
+    'Reflection': ['Reflection', 'RFL', 'reflection', 'rfl']
+    }
+
+COLORSPACES = {'srgb': 'sRGB', 'acescg': 'ACEScg', 'raw': 'Raw', 'linear': 'Linear', 'lin': 'Linear'}
+# Converted textures, next to their sources : never classified as source textures (see ignoredExtensions)
+IGNORED_EXTENSIONS = {'.rat'}
+TOKEN = re.compile(r"[^._\-\s]+")
+UDIM_MIN = 1001
+UDIM_MAX = 1999
+# Number written after an underscore, e.g. Wood_BaseColor_1001.exr : a UDIM tile only when other tiles of the same pattern
+# exist, a single Wood_Roughness_1024.png keeps its resolution suffix (see mergeTiles)
+UNDERSCORE_TILE = re.compile(r"_(1\d{3})(?=[._\-]|$)")
+
+def ignoredExtensions():
+    # Extensions written by the converter backends, studio backends included (see converters.register)
+    return IGNORED_EXTENSIONS | {backend.extension.lower() for backend in converters.BACKENDS if backend.extension}
+
+class TextureFile:
+    # Tokens of a texture file name, e.g. Wood_BaseColor_sRGB.1001.exr
+    __slots__ = ("fileName", "baseName", "channel", "udim", "colorspace", "extension", "pattern")
+
+    def __init__(self, fileName, baseName, channel, udim, colorspace, extension, pattern):
+        self.fileName = fileName
+        self.baseName = baseName
+        self.channel = channel
+        self.udim = udim
+        self.colorspace = colorspace
+        self.extension = extension
+        self.pattern = pattern
+
+    def __repr__(self):
+        return f"TextureFile({self.fileName!r}, channel={self.channel!r}, udim={self.udim!r})"
+
+class AliasTable:
+    # Precompiled channel lookup built from a channel -> aliases dictionary.
+    # Tokens are matched exactly (case insensitive), then by a camel case suffix (woodBaseColor)
+    def __init__(self, channelNames):
+        self.channelNames = channelNames
+        self.ignoredExtensions = ignoredExtensions()
+        self.lookup = {}
+        self.suffixes = {}
+        for channel, names in channelNames.items():
+            for name in names:
+                self.lookup[name.lower()] = channel
+                if name[:1].isupper():
+                    self.suffixes[name] = channel
+        aliases = sorted(self.suffixes, key=len, reverse=True)
+        self.suffixRegex = re.compile("(?<=[a-z0-9])(" + "|".join(re.escape(name) for name in aliases) + ")$") if aliases else None
+        # Fast path for the common <base>_<channel>[_<colorspace>][.<UDIM>].<ext> layout, matched in a single regex call.
+        # Only dot delimited tiles are UDIMs for the parser, underscore ones are checked against their siblings (see mergeTiles)
+        names = sorted(self.lookup, key=len, reverse=True)
+        self.layoutRegex = re.compile(
+            r"(?P<base>[^.]*?)[._\-](?P<channel>" + "|".join(re.escape(name) for name in names) + r")"
+            r"(?:[._\-](?P<colorspace>" + "|".join(COLORSPACES) + r"))?"
+            r"(?:\.(?P<udim>1\d{3}))?(?P<extension>\.[^.]+)", re.IGNORECASE) if names else None
+
+    def suffixChannel(self, token):
+        # Returns the channel and the offset of its alias in the token
+        match = self.suffixRegex.search(token) if self.suffixRegex else None
+        return (self.suffixes[match.group(1)], match.start()) if match else (None, 0)
+
+    def parse(self, fileName):
+        # Split the file name once into its tokens. Returns None for files without a known channel
+        match = self.layoutRegex.fullmatch(fileName) if self.layoutRegex else None
+        # 1000 is not a tile, the token parser handles it like any other number
+        if match and not (match.group("udim") and int(match.group("udim")) < UDIM_MIN):
+            extension = match.group("extension")
+            if extension.lower() in self.ignoredExtensions:
+                return None
+            udim = match.group("udim")
+            colorspace = match.group("colorspace")
+            pattern = fileName
+            if udim:
+                udimStart, udimEnd = match.span("udim")
+                pattern = fileName[:udimStart] + "<UDIM>" + fileName[udimEnd:]
+            return TextureFile(fileName, match.group("base"), self.lookup[match.group("channel").lower()],
+                               int(udim) if udim else None, COLORSPACES[colorspace.lower()] if colorspace else None,
+                               extension, pattern)
+
+        stem, extension = os.path.splitext(fileName)
+        if not stem or stem.startswith(".") or extension.lower() in self.ignoredExtensions:
+            return None
+
+        tokens = list(TOKEN.finditer(stem))
+        channelStart = 0
+        channel = None
+        udim = None
+        udimSpan = None
+        colorspace = None
+        # The last matching token wins, channels are usually written after the asset name
+        for match in reversed(tokens):
+            token = match.group(0)
+            if (udim is None and len(token) == 4 and token.isdigit() and UDIM_MIN <= int(token) <= UDIM_MAX
+                    and stem[match.start() - 1:match.start()] == "."):
+                udim = int(token)
+                udimSpan = match.span()
+                continue
+            lowerToken = token.lower()
+            if colorspace is None and lowerToken in COLORSPACES:
+                colorspace = COLORSPACES[lowerToken]
+                continue
+            if channel is None and lowerToken in self.lookup:
+                channel = self.lookup[lowerToken]
+                channelStart = match.start()
+
+        if channel is None:
+            for match in reversed(tokens):
+                channel, offset = self.suffixChannel(match.group(0))
+                if channel is not None:
+                    channelStart = match.start() + offset
+                    break
+            else:
+                return None
+
+        pattern = fileName
+        if udimSpan:
+            pattern = stem[:udimSpan[0]] + "<UDIM>" + stem[udimSpan[1]:] + extension
+        baseName = stem[:channelStart].rstrip("._- ")
+        return TextureFile(fileName, baseName, channel, udim, colorspace, extension, pattern)
+
+class TextureGroup:
+    # A texture pattern and its files. UDIM sets hold one tile per UDIM, other textures a single file
+    def __init__(self, directory, texture):
+        self.directory = directory
+        self.pattern = texture.pattern
+        self.channel = texture.channel
+        self.baseName = texture.baseName
+        self.colorspace = texture.colorspace
+        self.extension = texture.extension
+        self.tiles = []
+
+    def __repr__(self):
+        return f"TextureGroup({self.pattern!r}, tiles={len(self.tiles)})"
+
+    def addTile(self, udim, fileName, size):
+        self.tiles.append((udim, fileName, size))
+
+    def isUdim(self):
+        return "<UDIM>" in self.pattern
+
+    def tileRange(self):
+        udims = [udim for udim, fileName, size in self.tiles if udim is not None]
+        return (udims[0], udims[-1]) if udims else None
+
+    def files(self):
+        return [os.path.join(self.directory, fileName) for udim, fileName, size in self.tiles]
+
+    def sizes(self):
+        return {udim: size for udim, fileName, size in self.tiles}
+
+    def totalSize(self):
+        return sum(size for udim, fileName, size in self.tiles)
+
+class MaterialAsset:
+    # Texture groups sharing a material base name in one directory
+    def __init__(self, directory, baseName):
+        self.directory = directory
+        self.baseName = baseName
+        self.groups = {}
+
+    def __repr__(self):
+        return f"MaterialAsset({self.baseName!r}, {self.directory!r}, groups={len(self.groups)})"
+
+    def channels(self):
+        return channelPatterns(self.groups)
+
+def addTexture(groups, directory, texture, entry):
+    group = groups.get(texture.pattern)
+    if group is None:
+        group = groups[texture.pattern] = TextureGroup(directory, texture)
+    group.addTile(texture.udim, entry.name, entry.stat().st_size)
+
+def mergeTiles(groups):
+    # Single textures differing only by an underscore tile number (Wood_BaseColor_1001.exr, Wood_BaseColor_1002.exr)
+    # are the tiles of one UDIM set. A number without sibling tiles is left in the file name
+    candidates = {}
+    for pattern, group in groups.items():
+        if group.isUdim() or len(group.tiles) != 1:
+            continue
+        stem, extension = os.path.splitext(pattern)
+        match = None
+        for match in UNDERSCORE_TILE.finditer(stem):
+            pass
+        if match is None or not UDIM_MIN <= int(match.group(1)) <= UDIM_MAX:
+            continue
+        tilePattern = stem[:match.start(1)] + "<UDIM>" + stem[match.end(1):] + extension
+        candidates.setdefault(tilePattern, []).append((int(match.group(1)), pattern))
+    for tilePattern, tiles in candidates.items():
+        if len(tiles) < 2:
+            continue
+        merged = copy.copy(groups[tiles[0][1]])
+        merged.pattern = tilePattern
+        merged.tiles = []
+        for udim, pattern in tiles:
+            fileName, size = groups.pop(pattern).tiles[0][1:]
+            merged.tiles.append((udim, fileName, size))
+        groups[tilePattern] = merged
+
+def sortTiles(groups):
+    mergeTiles(groups)
+    for group in groups.values():
+        group.tiles.sort(key=lambda tile: tile[0] or 0)
+
+def splitGlobs(globs):
+    # Accept "*.exr, *.png" or ["*.exr", "*.png"]
+    if not globs:
+        return []
+    if isinstance(globs, str):
+        globs = globs.replace(",", " ").split()
+    return list(globs)
+
+def matchesGlobs(name, relativePath, globs):
+    return any(fnmatch.fnmatch(name, glob) or fnmatch.fnmatch(relativePath, glob) for glob in globs)
+
+def walkTextures(rootDirectory, aliasTable=None, baseName="", depth=None, include=None, exclude=None, scanCache=None):
+    # Stream the files of a folder tree as (directory, entry, texture), shallow folders first.
+    # texture is the parsed TextureFile, files without a channel are skipped when an aliasTable is given.
+    # depth limits the recursion (0 : root folder only), include/exclude are globs on names or relative paths.
+    # scanCache : utils.scancache.ScanCache reusing the listings and classification of the unchanged folders
+    if scanCache is not None:
+        yield from walkCachedTextures(rootDirectory, scanCache, baseName, depth, include, exclude)
+        return
+    include = splitGlobs(include)
+    exclude = splitGlobs(exclude)
+    directories = deque([(rootDirectory, 0)])
+    while directories:
+        directory, level = directories.popleft()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        relativeDir = "" if level == 0 else os.path.relpath(directory, rootDirectory).replace("\\", "/") + "/"
+        with entries:
+            for entry in entries:
+                relativePath = relativeDir + entry.name
+                if exclude and matchesGlobs(entry.name, relativePath, exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if depth is None or level < depth:
+                        directories.append((entry.path, level + 1))
+                    continue
+                if baseName not in entry.name or (include and not matchesGlobs(entry.name, relativePath, include)):
+                    continue
+                texture = None
+                if aliasTable is not None:
+                    texture = aliasTable.parse(entry.name)
+                    if texture is None:
+                        continue
+                if entry.is_file():
+                    yield directory, entry, texture
+
+def walkCachedTextures(rootDirectory, scanCache, baseName="", depth=None, include=None, exclude=None):
+    # Same walk as walkTextures, from the cached listings. Only the textures with a channel are yielded
+    include = splitGlobs(include)
+    exclude = splitGlobs(exclude)
+    directories = deque([(rootDirectory, 0)])
+    while directories:
+        directory, level = directories.popleft()
+        try:
+            listing = scanCache.listing(directory)
+        except OSError:
+            continue
+        relativeDir = "" if level == 0 else os.path.relpath(directory, rootDirectory).replace("\\", "/") + "/"
+        for name in listing.folders:
+            if exclude and matchesGlobs(name, relativeDir + name, exclude):
+                continue
+            if depth is None or level < depth:
+                directories.append((os.path.join(directory, name), level + 1))
+        for entry, texture in listing.files:
+            if texture is None or baseName not in entry.name:
+                continue
+            relativePath = relativeDir + entry.name
+            if exclude and matchesGlobs(entry.name, relativePath, exclude):
+                continue
+            if include and not matchesGlobs(entry.name, relativePath, include):
+                continue
+            yield directory, entry, texture
+
+def groupTextures(directory, aliasTable, baseName=""):
+    # Read the directory once and group its textures by pattern. Returns {pattern: TextureGroup}
+    groups = {}
+    for directory, entry, texture in walkTextures(directory, aliasTable, baseName, depth=0):
+        addTexture(groups, directory, texture, entry)
+    sortTiles(groups)
+    return groups
+
+class MaterialCollector:
+    # Group streamed textures per directory and material base name.
+    # With an assetName, every texture of a directory goes to that material
+    def __init__(self, assetName=None):
+        self.assetName = assetName
+        self.assets = {}
+
+    def add(self, directory, entry, texture):
+        assetName = self.assetName or texture.baseName or os.path.basename(directory)
+        key = (directory, assetName)
+        asset = self.assets.get(key)
+        if asset is None:
+            asset = self.assets[key] = MaterialAsset(directory, assetName)
+        addTexture(asset.groups, directory, texture, entry)
+        return asset
+
+    def results(self):
+        # The MaterialAssets sorted by directory and name
+        for asset in self.assets.values():
+            sortTiles(asset.groups)
+        return [self.assets[key] for key in sorted(self.assets)]
+
+def findMaterials(rootDirectory, aliasTable, baseName="", depth=None, include=None, exclude=None):
+    # Walk the folder tree once and group its textures per directory and material base name
+    collector = MaterialCollector()
+    for directory, entry, texture in walkTextures(rootDirectory, aliasTable, baseName, depth, include, exclude):
+        collector.add(directory, entry, texture)
+    return collector.results()
+
+def channelPatterns(groups):
+    # {channel: pattern}, the last pattern found wins like in the directory listing
+    return {group.channel: pattern for pattern, group in groups.items()}
+
+def scanTextures(fileNames, aliasTable, baseName=""):
+    # Classify a directory listing in one pass. Returns {channel: texture pattern}
+    channels = {}
+    for fileName in fileNames:
+        if baseName not in fileName:
+            continue
+        texture = aliasTable.parse(fileName)
+        if texture is not None:
+            channels[texture.channel] = texture.pattern
+    return channels
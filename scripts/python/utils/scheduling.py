@@ -0,0 +1,122 @@
+####################### Conversion Scheduling #######################
+# Memory and disk cost of the conversion jobs, used by the conversion pool to keep the jobs running
+# at the same time under a memory budget, and to check the output volume has room for them.
+# The budget is given to the pool, or by GTTOOLS_MEMORY_BUDGET (in MB), half of the physical memory by default
+# Imports
+import os
+import shutil
+import ctypes
+import platform
+import logging
+
+from utils import probe
+
+try:
+    import OpenImageIO as oiio
+except ImportError:
+    oiio = None
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+MEMORY_BUDGET_ENV = "GTTOOLS_MEMORY_BUDGET"
+MB = 1024 * 1024
+# Space left free on the output volume
+DISK_RESERVE = 512 * MB
+# The converters hold the source image and the output being built
+MEMORY_FACTOR = 2.0
+# Mipmapped output, tiled and uncompressed in the worst case
+MIPMAP_FACTOR = 4.0 / 3.0
+# Ratio between the decoded image and the source file, when the header cannot be read
+COMPRESSION_FACTOR = 4.0
+
+def physicalMemory():
+    # Physical memory in bytes, None when it cannot be found
+    if platform.system() == "Windows":
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+        return None
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def defaultMemoryBudget():
+    # Memory budget in bytes, None for no limit
+    budget = os.getenv(MEMORY_BUDGET_ENV, "")
+    if budget:
+        try:
+            return int(float(budget) * MB)
+        except ValueError:
+            logger.warning(f"Invalid {MEMORY_BUDGET_ENV} value: {budget}")
+    memory = physicalMemory()
+    return memory // 2 if memory else None
+
+def imageSpec(path):
+    # (width, height, channels, bytes per channel) read from the image header, None when it cannot be read.
+    # PNG, JPEG, TIFF and EXR headers are read directly (see utils.probe), OpenImageIO reads the other formats
+    info = probe.probe(path)
+    if info is not None:
+        return info.width, info.height, info.channels, max(info.bitDepth // 8, 1)
+    if oiio is None:
+        return None
+    image = oiio.ImageInput.open(path)
+    if image is None:
+        return None
+    try:
+        spec = image.spec()
+        return spec.width, spec.height, spec.nchannels, spec.format.size()
+    finally:
+        image.close()
+
+def decodedSize(path):
+    # Size of the decoded image in bytes
+    spec = imageSpec(path)
+    if spec is not None:
+        width, height, channels, channelSize = spec
+        return width * height * channels * channelSize
+    try:
+        return int(os.path.getsize(path) * COMPRESSION_FACTOR)
+    except OSError:
+        return 0
+
+def jobCost(job, scale=1.0):
+    # (memory, disk) in bytes needed by the job, estimated once.
+    # scale : resolution ratio of the output (proxy tiers)
+    if job.memoryCost is None:
+        size = decodedSize(job.inputFile)
+        job.memoryCost = int(size * MEMORY_FACTOR)
+        job.diskCost = int(size * scale * scale * MIPMAP_FACTOR)
+    return job.memoryCost, job.diskCost
+
+def existingFolder(directory):
+    # The output folders may not be created yet, use their closest existing parent
+    while directory and not os.path.isdir(directory):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    return directory or "."
+
+def freeSpace(directory):
+    # Free bytes on the volume of directory, None when it cannot be found
+    try:
+        return shutil.disk_usage(existingFolder(directory)).free
+    except OSError:
+        return None
+
+def volume(path):
+    # Device of the volume holding path, to sum the disk costs of the jobs writing to the same volume
+    directory = existingFolder(os.path.dirname(os.path.abspath(path)))
+    try:
+        return os.stat(directory).st_dev
+    except OSError:
+        return directory
@@ -0,0 +1,200 @@
+####################### Watch Folder #######################
+# Watch a texture folder and report the textures created or modified in it, once they are fully written.
+# File system events come from watchdog (inotify, FSEvents, ReadDirectoryChangesW) when it is installed,
+# otherwise the folder is polled with os.scandir. A file is reported when its size and modification time
+# stayed the same for SETTLE_TIME seconds, so textures still being exported are not picked up half written.
+# Imports
+import os
+import time
+import threading
+import logging
+
+from utils import scanner
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+POLL_INTERVAL = 2.0
+SETTLE_TIME = 3.0
+
+def fileState(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class EventHandler(FileSystemEventHandler):
+    # Forward the watchdog events to the watcher
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.markChanged(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.markChanged(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.markChanged(event.dest_path)
+
+class FolderWatcher:
+    # Call onReady(files) from a background thread with the textures created or modified since the last call.
+    # settings : inputDirectory, recursive, depth, include, exclude (same keys as the Texture Converter).
+    # extensions : file extensions watched, every file by default
+    def __init__(self, settings, onReady, pollInterval=POLL_INTERVAL, settleTime=SETTLE_TIME, extensions=None):
+        self.directory = os.path.normpath(settings.get("inputDirectory", ""))
+        self.depth = settings.get("depth", None) if settings.get("recursive", False) else 0
+        self.include = scanner.splitGlobs(settings.get("include"))
+        self.exclude = scanner.splitGlobs(settings.get("exclude"))
+        self.onReady = onReady
+        self.pollInterval = pollInterval
+        self.settleTime = settleTime
+        self.extensions = tuple(extension.lower() for extension in extensions or [])
+        # path -> (state, time of the last change)
+        self.pending = {}
+        self.known = {}
+        self.lock = threading.Lock()
+        self.stopEvent = threading.Event()
+        self.thread = None
+        self.observer = None
+
+    def matches(self, path):
+        # Same rules as the folder walk : extension, hidden files, depth and globs
+        name = os.path.basename(path)
+        if name.startswith(".") or (self.extensions and not name.lower().endswith(self.extensions)):
+            return False
+        relativePath = os.path.relpath(path, self.directory).replace("\\", "/")
+        if relativePath.startswith("../"):
+            return False
+        if self.depth is not None and relativePath.count("/") > self.depth:
+            return False
+        if self.exclude and scanner.matchesGlobs(name, relativePath, self.exclude):
+            return False
+        if self.include and not scanner.matchesGlobs(name, relativePath, self.include):
+            return False
+        return True
+
+    def snapshot(self):
+        # {path: (size, mtime)} of the watched textures
+        states = {}
+        for directory, entry, texture in scanner.walkTextures(self.directory, depth = self.depth, include = self.include, exclude = self.exclude):
+            if entry.name.startswith(".") or (self.extensions and not entry.name.lower().endswith(self.extensions)):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            states[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return states
+
+    def markChanged(self, path):
+        path = os.path.normpath(path)
+        if not self.matches(path):
+            return
+        with self.lock:
+            self.pending[path] = (fileState(path), time.time())
+
+    def poll(self):
+        # Compare the folder with the previous snapshot (polling mode)
+        states = self.snapshot()
+        now = time.time()
+        with self.lock:
+            for path, state in states.items():
+                if self.known.get(path) != state and path not in self.pending:
+                    self.pending[path] = (state, now)
+            self.known = states
+
+    def settledFiles(self):
+        # Files whose size and modification time did not change for settleTime seconds
+        ready = []
+        now = time.time()
+        with self.lock:
+            for path, (state, lastChange) in list(self.pending.items()):
+                currentState = fileState(path)
+                if currentState is None:
+                    del self.pending[path]
+                elif currentState != state:
+                    self.pending[path] = (currentState, now)
+                elif now - lastChange >= self.settleTime:
+                    del self.pending[path]
+                    self.known[path] = currentState
+                    ready.append(path)
+        return sorted(ready)
+
+    def run(self):
+        lastPoll = 0.0
+        while not self.stopEvent.is_set():
+            if self.observer is None and time.time() - lastPoll >= self.pollInterval:
+                self.poll()
+                lastPoll = time.time()
+            ready = self.settledFiles()
+            if ready:
+                try:
+                    self.onReady(ready)
+                except Exception as e:
+                    logger.error(f"Watch folder {self.directory}: {e}")
+            self.stopEvent.wait(min(self.pollInterval, self.settleTime / 2.0))
+
+    def start(self):
+        if self.isRunning():
+            return
+        # The files already in the folder are the reference, only the following changes are reported
+        self.known = self.snapshot()
+        self.stopEvent.clear()
+        if Observer is not None:
+            self.observer = Observer()
+            self.observer.schedule(EventHandler(self), self.directory, recursive = self.depth != 0)
+            self.observer.daemon = True
+            self.observer.start()
+        self.thread = threading.Thread(target=self.run, name=f"GT_watchFolder {self.directory}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopEvent.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def isRunning(self):
+        return self.thread is not None and self.thread.is_alive()
+
+# Keep the running watchers when the module is reloaded
+try:
+    watchers
+except NameError:
+    watchers = {}
+
+def watch(settings, onReady, **kwargs):
+    # Start watching settings["inputDirectory"], replacing the previous watcher of that folder
+    directory = os.path.normpath(settings.get("inputDirectory", ""))
+    stopWatching(directory)
+    watcher = FolderWatcher(settings, onReady, **kwargs)
+    watcher.start()
+    watchers[directory] = watcher
+    return watcher
+
+def stopWatching(directory=None):
+    # Stop the watcher of a folder, or every watcher when directory is None
+    directories = list(watchers) if directory is None else [os.path.normpath(directory)]
+    for watchedDirectory in directories:
+        watcher = watchers.pop(watchedDirectory, None)
+        if watcher is not None:
+            watcher.stop()
+
+def watchedFolders():
+    return [directory for directory, watcher in watchers.items() if watcher.isRunning()]